@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the photo organizer
+Builds a synthetic SmartSwitch backup and measures the organizer in a
+child process, so numbers are not skewed by the benchmark itself
+
+  python benchmark.py memory --files 20000
+  python benchmark.py startup
+"""
+
+import os
+import sys
+import time
+import shutil
+import struct
+import argparse
+import tempfile
+import statistics
+import subprocess
+from typing import Dict, List, Tuple
+
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ORGANIZER = os.path.join(SCRIPT_DIR, "family_photo_organizer.py")
+
+# Documented peak RSS target for --low-memory runs (see README "성능"), and
+# how much that peak may grow when the backup gets 4x larger (it should not)
+LOW_MEMORY_RSS_TARGET_MB = 80
+LOW_MEMORY_GROWTH_MB = 5
+
+
+def fake_jpeg(seed: int, width: int = 4000, height: int = 3000) -> bytes:
+    """Minimal JPEG: SOI, SOF0 with full-size dimensions, unique payload, EOI"""
+    sof = b'\xff\xc0' + struct.pack('>HBHHB', 11, 8, height, width, 1) + b'\x01\x11\x00'
+    payload = seed.to_bytes(8, 'big') * (64 + seed % 64)
+    return b'\xff\xd8' + sof + b'\xff\xda' + payload + b'\xff\xd9'
+
+
+def build_backup(root: str, files: int, per_folder: int = 1000) -> str:
+    """Create SM-TEST/<timestamp>/PHOTO/DCIM/Camera_NNN/YYYYMMDD_HHMMSS.jpg files"""
+    backup = os.path.join(root, "SM-TEST_bench", "1757590576343", "PHOTO", "DCIM")
+    base = time.mktime((2012, 1, 1, 0, 0, 0, 0, 0, -1))
+    for i in range(files):
+        folder = os.path.join(backup, f"Camera_{i // per_folder:03d}")
+        if i % per_folder == 0:
+            os.makedirs(folder, exist_ok=True)
+        # Six hours apart: ~1500 files per year folder, like a real camera roll
+        name = time.strftime('%Y%m%d_%H%M%S', time.localtime(base + i * 6 * 3600))
+        with open(os.path.join(folder, f"{name}.jpg"), 'wb') as f:
+            f.write(fake_jpeg(i))
+    return os.path.join(root, "SM-TEST_bench")
+
+
+def run_child(args: List[str]) -> Dict:
+    """Run the organizer and return wall time and peak RSS of that child only"""
+    start = time.monotonic()
+    proc = subprocess.Popen([sys.executable] + args,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    # ru_maxrss is KB on Linux
+    return {
+        'seconds': time.monotonic() - start,
+        'peak_rss_mb': usage.ru_maxrss / 1024,
+        'returncode': proc.returncode,
+    }
+
+
+def import_times(stderr: str) -> List[Tuple[int, str]]:
+    """Top-level (cumulative us, module) pairs from -X importtime output"""
+    result = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented below their parent
+        if name.startswith(' ') and not name.startswith('  '):
+            result.append((int(cumulative), name.strip()))
+    return sorted(result, reverse=True)
+
+
+def bench_startup(runs: int, max_ms: float = None) -> bool:
+    """Cold-start time of an --analyze-only run plus its slowest top-level imports"""
+    root = tempfile.mkdtemp(prefix="photo_bench_")
+    try:
+        source = build_backup(root, 200, per_folder=50)
+        target = os.path.join(root, "library")
+        args = [sys.executable, ORGANIZER, source, target, '--analyze-only']
+
+        timings = []
+        for _ in range(runs):
+            start = time.monotonic()
+            subprocess.run(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+            timings.append((time.monotonic() - start) * 1000)
+
+        proc = subprocess.run([sys.executable, '-X', 'importtime'] + args[1:],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                              text=True, check=True)
+        imports = import_times(proc.stderr)
+
+        median = statistics.median(timings)
+        print(f"--analyze-only startup: median {median:.0f} ms, "
+              f"min {min(timings):.0f} ms over {runs} runs")
+        print(f"Imports: {sum(us for us, _ in imports) / 1000:.1f} ms total, slowest:")
+        for us, name in imports[:10]:
+            print(f"  {us / 1000:7.1f} ms  {name}")
+
+        if max_ms is None:
+            return True
+        ok = median <= max_ms
+        print(f"startup target: <= {max_ms:.0f} ms -> {'PASS' if ok else 'FAIL'}")
+        return ok
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def bench_memory(files: int, keep: bool = False) -> bool:
+    """
+    Peak RSS of full imports, default vs --low-memory, at files/4 and files
+    A single size cannot show a regression: the bound must hold as the backup grows
+    """
+    root = tempfile.mkdtemp(prefix="photo_bench_")
+    try:
+        sizes = (max(files // 4, 1), files)
+        results = {}
+        for count in sizes:
+            print(f"Building synthetic backup with {count} files in {root} ...")
+            source = build_backup(os.path.join(root, f"backup_{count}"), count)
+            for label, extra in (('default', []), ('low-memory', ['--low-memory'])):
+                target = os.path.join(root, f"library_{label}_{count}")
+                r = results[label, count] = run_child([ORGANIZER, source, target] + extra)
+                status = '' if r['returncode'] == 0 else f" (exit {r['returncode']})"
+                print(f"{count:>7} {label:>10}: {r['seconds']:.1f}s, "
+                      f"peak RSS {r['peak_rss_mb']:.1f} MB{status}")
+
+        small, large = sizes
+        growth = {label: results[label, large]['peak_rss_mb'] - results[label, small]['peak_rss_mb']
+                  for label in ('default', 'low-memory')}
+        print(f"Growth {small} -> {large} files: default {growth['default']:+.1f} MB, "
+              f"low-memory {growth['low-memory']:+.1f} MB")
+
+        peak = results['low-memory', large]['peak_rss_mb']
+        checks = [
+            ("runs succeed", all(r['returncode'] == 0 for r in results.values())),
+            (f"low-memory peak <= {LOW_MEMORY_RSS_TARGET_MB} MB", peak <= LOW_MEMORY_RSS_TARGET_MB),
+            (f"low-memory growth <= {LOW_MEMORY_GROWTH_MB} MB", growth['low-memory'] <= LOW_MEMORY_GROWTH_MB),
+        ]
+        for name, ok in checks:
+            print(f"{name} -> {'PASS' if ok else 'FAIL'}")
+        return all(ok for _, ok in checks)
+    finally:
+        if keep:
+            print(f"Kept {root}")
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Photo organizer benchmarks')
+    sub = parser.add_subparsers(dest='bench', required=True)
+
+    memory = sub.add_parser('memory', help='Peak RSS of default vs --low-memory imports at two sizes')
+    memory.add_argument('--files', type=int, default=20000,
+                        help='Synthetic files of the larger run; the smaller has a quarter (default: 20000)')
+    memory.add_argument('--keep', action='store_true', help='Keep the synthetic backup and libraries')
+
+    startup = sub.add_parser('startup', help='Cold-start time and import cost of --analyze-only')
+    startup.add_argument('--runs', type=int, default=10, help='Timed runs (default: 10)')
+    startup.add_argument('--max-ms', type=float, help='Fail if the median exceeds this')
+
+    args = parser.parse_args()
+
+    if args.bench == 'memory':
+        ok = bench_memory(args.files, keep=args.keep)
+    elif args.bench == 'startup':
+        ok = bench_startup(args.runs, max_ms=args.max_ms)
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
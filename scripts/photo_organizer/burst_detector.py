@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Burst Detector Module
+Group burst shots and motion-photo sequences (many files within a few
+seconds in one folder) so they can be processed and named as one unit
+"""
+
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+class BurstDetector:
+    """Detect bursts from capture time, file size and optional perceptual hash"""
+
+    # Capture-time sources trusted for grouping (mtime is not a capture time:
+    # restored files often share one mtime and would look like a huge burst)
+    TIME_SOURCES = ('exif', 'filename')
+
+    def __init__(self, max_gap: float = 2.0, min_size_ratio: float = 0.5,
+                 min_burst: int = 3, perceptual: bool = False, max_distance: int = 12):
+        """
+        Args:
+            max_gap: Maximum seconds between consecutive shots in one burst
+            min_size_ratio: Consecutive files must be within this size ratio (smaller/larger)
+            min_burst: Minimum number of files to call a sequence a burst
+            perceptual: Also require similar difference hashes (needs Pillow)
+            max_distance: Maximum Hamming distance between dHashes of consecutive shots
+        """
+        self.max_gap = max_gap
+        self.min_size_ratio = min_size_ratio
+        self.min_burst = min_burst
+        self.perceptual = perceptual
+        self.max_distance = max_distance
+        self.dhash_cache = {}
+
+    def dhash(self, file_path: Path) -> Optional[int]:
+        """
+        64-bit difference hash from a reduced-resolution decode
+        Image.draft() lets the JPEG decoder scale down by up to 8x while decoding
+        """
+        key = str(file_path)
+        if key in self.dhash_cache:
+            return self.dhash_cache[key]
+
+        value = None
+        try:
+            from PIL import Image
+            with Image.open(file_path) as im:
+                im.draft('L', (64, 64))
+                pixels = list(im.convert('L').resize((9, 8)).getdata())
+            value = 0
+            for row in range(8):
+                for col in range(8):
+                    left = pixels[row * 9 + col]
+                    right = pixels[row * 9 + col + 1]
+                    value = (value << 1) | (1 if left > right else 0)
+        except Exception:
+            value = None
+
+        self.dhash_cache[key] = value
+        return value
+
+    def similar(self, a: Path, a_size: int, b: Path, b_size: int) -> bool:
+        """Whether two consecutive shots look like the same burst"""
+        if a.suffix.lower() != b.suffix.lower():
+            return False
+        if min(a_size, b_size) < self.min_size_ratio * max(a_size, b_size):
+            return False
+        if self.perceptual:
+            hash_a, hash_b = self.dhash(a), self.dhash(b)
+            if hash_a is not None and hash_b is not None:
+                return bin(hash_a ^ hash_b).count('1') <= self.max_distance
+        return True
+
+    def has_capture_time(self, metadata: Dict) -> bool:
+        """Whether the metadata has a datetime usable for burst grouping"""
+        return bool(metadata.get('datetime')) and metadata.get('datetime_source') in self.TIME_SOURCES
+
+    def find_groups(self, files: List[Path], metadata_list: List[Dict]) -> List[List[int]]:
+        """
+        Partition a batch into groups of indices
+        Bursts (>= min_burst files) come back as one group each; every other
+        file is a group of one. Groups are ordered by their first index
+        """
+        sizes = []
+        for file_path in files:
+            try:
+                sizes.append(file_path.stat().st_size)
+            except OSError:
+                sizes.append(0)
+
+        # Sort candidates by folder and capture time
+        order = sorted(
+            (i for i, m in enumerate(metadata_list) if self.has_capture_time(m)),
+            key=lambda i: (str(files[i].parent), metadata_list[i]['datetime'], files[i].name)
+        )
+
+        groups = []
+        current = []
+        for i in order:
+            if current:
+                prev = current[-1]
+                gap = (metadata_list[i]['datetime'] - metadata_list[prev]['datetime']).total_seconds()
+                if (files[i].parent == files[prev].parent and 0 <= gap <= self.max_gap
+                        and self.similar(files[prev], sizes[prev], files[i], sizes[i])):
+                    current.append(i)
+                    continue
+                groups.append(current)
+            current = [i]
+        if current:
+            groups.append(current)
+
+        result = []
+        grouped = set()
+        for group in groups:
+            if len(group) >= self.min_burst:
+                result.append(sorted(group))
+                grouped.update(group)
+        result.extend([i] for i in range(len(files)) if i not in grouped)
+        result.sort(key=lambda g: g[0])
+
+        # Hashes are only compared within one batch
+        self.dhash_cache.clear()
+        return result
+
+    @staticmethod
+    def representative(files: List[Path]) -> int:
+        """
+        Pick the burst representative: the largest file
+        (JPEG size tracks detail, so blurred frames tend to be smaller)
+        """
+        best = 0
+        best_size = -1
+        for i, file_path in enumerate(files):
+            try:
+                size = file_path.stat().st_size
+            except OSError:
+                continue
+            if size > best_size:
+                best, best_size = i, size
+        return best
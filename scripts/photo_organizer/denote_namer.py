@@ -151,10 +151,12 @@ class DenoteNamer:
 
         return tags
 
-    def generate_denote_name(self, filepath: str, custom_tags: List[str] = None) -> str:
+    def generate_denote_name(self, filepath: str, custom_tags: List[str] = None,
+                             extra_tags: List[str] = None) -> str:
         """
         Generate Denote-style filename
         Format: YYYYMMDDTHHMMSS--original-name__tag1_tag2.ext
+        extra_tags are appended to the determined (or custom) tags, e.g. place tags
         """
         # Extract datetime
         dt = self.extract_datetime(filepath)
@@ -170,7 +172,10 @@ class DenoteNamer:
         original_sanitized = self.sanitize_filename(original)
 
         # Determine tags
-        tags = custom_tags if custom_tags else self.determine_tags(filepath)
+        tags = list(custom_tags) if custom_tags else self.determine_tags(filepath)
+        for tag in extra_tags or []:
+            if tag and tag not in tags:
+                tags.append(tag)
         tags_str = "_".join(tags) if tags else ""
 
         # Get file extension
@@ -5,41 +5,161 @@ Efficiently detect duplicate files using size and hash comparison
 """
 
 import os
+import time
+import shutil
+import filecmp
 import hashlib
+import threading
 from pathlib import Path
-from typing import Dict, List, Set, Tuple, Optional
-from collections import defaultdict
+from typing import Callable, Dict, Iterator, List, Set, Tuple, Optional
+from collections import defaultdict, OrderedDict
 import json
 
 
+# Linux FICLONE ioctl (_IOW(0x94, 9, int)): share extents on btrfs/XFS
+FICLONE = 0x40049409
+
+RECLAIM_ACTIONS = ('report', 'hardlink', 'reflink', 'quarantine')
+
+
+class HashStore:
+    """
+    Bounded-memory hash cache: an LRU dict in front of a SQLite table
+    Supports the dict operations DuplicateChecker uses (in, [], []=)
+    """
+
+    def __init__(self, db_file: str, max_entries: int = 50000, flush_every: int = 1000):
+        """
+        Args:
+            db_file: SQLite file holding every cached hash
+            max_entries: Hashes kept in memory (least recently used are evicted)
+            flush_every: Pending writes buffered before a batched INSERT
+        """
+        self.max_entries = max_entries
+        self.flush_every = flush_every
+        self.lru = OrderedDict()
+        self.pending = {}
+        self.lock = threading.RLock()
+
+        import sqlite3
+        self.db = sqlite3.connect(db_file, check_same_thread=False)
+        self.db.execute("CREATE TABLE IF NOT EXISTS hashes (key TEXT PRIMARY KEY, hash TEXT NOT NULL)")
+
+    def _remember(self, key: str, value: str):
+        self.lru[key] = value
+        self.lru.move_to_end(key)
+        if len(self.lru) > self.max_entries:
+            self.lru.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        with self.lock:
+            return self._get(key)
+
+    def _get(self, key: str) -> Optional[str]:
+        if key in self.lru:
+            self.lru.move_to_end(key)
+            return self.lru[key]
+        value = self.pending.get(key)
+        if value is None:
+            row = self.db.execute("SELECT hash FROM hashes WHERE key = ?", (key,)).fetchone()
+            value = row[0] if row else None
+        if value is not None:
+            self._remember(key, value)
+        return value
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def __getitem__(self, key: str) -> str:
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: str):
+        with self.lock:
+            self._remember(key, value)
+            self.pending[key] = value
+            if len(self.pending) >= self.flush_every:
+                self.flush()
+
+    def flush(self):
+        """Write pending hashes to SQLite in one transaction"""
+        with self.lock:
+            self._flush()
+
+    def _flush(self):
+        if self.pending:
+            with self.db:
+                self.db.executemany("INSERT OR REPLACE INTO hashes (key, hash) VALUES (?, ?)",
+                                    self.pending.items())
+            self.pending = {}
+
+
 class DuplicateChecker:
     """Handle duplicate detection for media files"""
 
-    def __init__(self, cache_file: str = None):
+    def __init__(self, cache_file: str = None, max_cache_entries: int = None):
         """
         Initialize duplicate checker with optional cache file
+        max_cache_entries: If set, use a bounded LRU over a SQLite store
+                           (<cache_file>.sqlite) instead of loading the JSON cache
+        The cache is opened/loaded lazily on the first hash lookup
         """
         self.cache_file = cache_file
-        self.hash_cache = {}
+        self.max_cache_entries = max_cache_entries
+        self._hash_cache = None
+        # First access may come from several hashing threads at once
+        self._cache_lock = threading.Lock()
         self.size_groups = defaultdict(list)
         self.duplicates = defaultdict(list)
-
-        # Load cache if exists
-        if cache_file and os.path.exists(cache_file):
-            self.load_cache()
-
-    def load_cache(self):
-        """Load hash cache from file"""
+        # Work counters for metrics: hashed bytes/seconds, cache hits,
+        # duplicate candidates by tier (size match, hash match)
+        self.counters = defaultdict(float)
+
+    @property
+    def hash_cache(self):
+        """Hash cache (dict or HashStore), loaded on first access"""
+        if self._hash_cache is None:
+            with self._cache_lock:
+                # Only publish the cache once it is fully loaded
+                if self._hash_cache is None:
+                    if self.max_cache_entries and self.cache_file:
+                        db_file = os.path.splitext(self.cache_file)[0] + ".sqlite"
+                        os.makedirs(os.path.dirname(db_file) or '.', exist_ok=True)
+                        self._hash_cache = HashStore(db_file, max_entries=self.max_cache_entries)
+                    # Load cache if exists
+                    elif self.cache_file and os.path.exists(self.cache_file):
+                        self._hash_cache = self.read_cache()
+                    else:
+                        self._hash_cache = {}
+        return self._hash_cache
+
+    @hash_cache.setter
+    def hash_cache(self, value):
+        self._hash_cache = value
+
+    def read_cache(self) -> Dict[str, str]:
+        """Read the JSON hash cache file"""
         try:
             with open(self.cache_file, 'r') as f:
-                self.hash_cache = json.load(f)
+                return json.load(f)
         except Exception as e:
             print(f"Warning: Could not load cache: {e}")
-            self.hash_cache = {}
+            return {}
+
+    def load_cache(self):
+        """Load hash cache from file"""
+        self.hash_cache = self.read_cache()
 
     def save_cache(self):
         """Save hash cache to file"""
-        if self.cache_file:
+        if self._hash_cache is None:
+            # Never used, nothing to write
+            return
+        if isinstance(self.hash_cache, HashStore):
+            self.hash_cache.flush()
+        elif self.cache_file:
             try:
                 with open(self.cache_file, 'w') as f:
                     json.dump(self.hash_cache, f, indent=2)
@@ -54,14 +174,19 @@ class DuplicateChecker:
         if not os.path.exists(filepath):
             return None
 
-        # Check cache first
+        # Check cache first (partial hashes are cached under their own key)
         cache_key = f"{filepath}:{os.path.getmtime(filepath)}"
+        if quick:
+            cache_key += ":quick"
         if cache_key in self.hash_cache:
+            self.counters['hash_cache_hits'] += 1
             return self.hash_cache[cache_key]
 
         try:
+            start = time.monotonic()
             hasher = hashlib.md5()
             file_size = os.path.getsize(filepath)
+            read_bytes = 0
 
             with open(filepath, 'rb') as f:
                 if quick and file_size > 131072:  # 128KB
@@ -70,6 +195,7 @@ class DuplicateChecker:
                     # Hash last 64KB
                     f.seek(-65536, os.SEEK_END)
                     hasher.update(f.read(65536))
+                    read_bytes = 131072
                 else:
                     # Hash entire file in chunks
                     while True:
@@ -77,8 +203,11 @@ class DuplicateChecker:
                         if not chunk:
                             break
                         hasher.update(chunk)
+                        read_bytes += len(chunk)
 
             file_hash = hasher.hexdigest()
+            self.counters['hash_bytes'] += read_bytes
+            self.counters['hash_seconds'] += time.monotonic() - start
             self.hash_cache[cache_key] = file_hash
             return file_hash
 
@@ -86,6 +215,41 @@ class DuplicateChecker:
             print(f"Error calculating hash for {filepath}: {e}")
             return None
 
+    def copy_with_hash(self, source_file: str, target_file: str,
+                       chunk_size: int = 1024 * 1024) -> Tuple[str, int]:
+        """
+        Copy a file (data and metadata, like shutil.copy2) and compute its MD5
+        in the same read pass, so the source is read only once
+        Both paths are cached under the digest. An existing target_file is
+        never overwritten (FileExistsError)
+        Returns (md5, bytes copied)
+        """
+        hasher = hashlib.md5()
+        copied = 0
+        hash_seconds = 0.0
+        with open(source_file, 'rb') as src, open(target_file, 'xb') as dst:
+            while True:
+                # Read + hash time, like calculate_hash (the write is copy time)
+                start = time.monotonic()
+                chunk = src.read(chunk_size)
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                hash_seconds += time.monotonic() - start
+                dst.write(chunk)
+                copied += len(chunk)
+        shutil.copystat(source_file, target_file)
+
+        # Counted as hashed, but the read itself is the copy's
+        self.counters['hash_bytes'] += copied
+        self.counters['copy_hash_bytes'] += copied
+        self.counters['hash_seconds'] += hash_seconds
+
+        file_hash = hasher.hexdigest()
+        self.hash_cache[f"{source_file}:{os.path.getmtime(source_file)}"] = file_hash
+        self.hash_cache[f"{target_file}:{os.path.getmtime(target_file)}"] = file_hash
+        return file_hash, copied
+
     def group_by_size(self, filepaths: List[str]) -> Dict[int, List[str]]:
         """
         Group files by size - first step in duplicate detection
@@ -132,17 +296,26 @@ class DuplicateChecker:
 
         return duplicate_groups
 
-    def find_duplicates(self, filepaths: List[str], min_size: int = 10240) -> Dict[str, List[str]]:
+    def iter_duplicates(self, filepaths: List[str], min_size: int = 10240,
+                        workers: int = 4) -> Iterator[Tuple[str, List[str]]]:
         """
-        Find all duplicate files in the given list
-        min_size: Minimum file size to consider (default 10KB to skip thumbnails)
-        Returns: Dictionary with hash as key and list of duplicate files as value
+        Yield (hash, duplicate files) groups as soon as each size group is hashed
+        Size groups are hashed in parallel threads (hashlib releases the GIL on
+        large buffers, so disk reads and hashing overlap). Hardlinks of one
+        inode count as a single file, since they take no extra space
         """
-        # Filter by minimum size
+        # Filter by minimum size, collapsing hardlinks
         valid_files = []
+        seen_inodes = set()
         for filepath in filepaths:
-            if os.path.exists(filepath) and os.path.getsize(filepath) >= min_size:
-                valid_files.append(filepath)
+            try:
+                st = os.stat(filepath)
+            except OSError:
+                continue
+            if st.st_size < min_size or (st.st_dev, st.st_ino) in seen_inodes:
+                continue
+            seen_inodes.add((st.st_dev, st.st_ino))
+            valid_files.append(filepath)
 
         print(f"Checking {len(valid_files)} files for duplicates...")
 
@@ -150,21 +323,99 @@ class DuplicateChecker:
         size_groups = self.group_by_size(valid_files)
         print(f"Found {len(size_groups)} size groups with potential duplicates")
 
-        # Step 2: Check hash within each size group
-        all_duplicates = {}
-        for size, files in size_groups.items():
-            duplicate_groups = self.find_duplicates_in_group(files)
-            for dup_group in duplicate_groups:
-                # Use the first file's hash as the key
-                file_hash = self.calculate_hash(dup_group[0], quick=False)
-                if file_hash:
-                    all_duplicates[file_hash] = dup_group
+        # Step 2: Check hash within each size group (largest groups first)
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = [executor.submit(self.find_duplicates_in_group, files)
+                       for size, files in sorted(size_groups.items(), reverse=True)]
+            for future in as_completed(futures):
+                for dup_group in future.result():
+                    # Use the first file's hash as the key (cached by now)
+                    file_hash = self.calculate_hash(dup_group[0], quick=False)
+                    if file_hash:
+                        yield file_hash, sorted(dup_group)
+
+    def find_duplicates(self, filepaths: List[str], min_size: int = 10240,
+                        workers: int = 4) -> Dict[str, List[str]]:
+        """
+        Find all duplicate files in the given list
+        min_size: Minimum file size to consider (default 10KB to skip thumbnails)
+        Returns: Dictionary with hash as key and list of duplicate files as value
+        """
+        all_duplicates = dict(self.iter_duplicates(filepaths, min_size, workers))
 
         # Save cache
         self.save_cache()
 
         return all_duplicates
 
+    def choose_keeper(self, files: List[str], rank: Callable[[str], int] = None) -> str:
+        """
+        Copy of a duplicate group to keep: lowest rank(path) first (e.g.
+        indexed library files before stray copies), then the oldest mtime
+        """
+        def key(filepath):
+            try:
+                mtime = os.path.getmtime(filepath)
+            except OSError:
+                mtime = float('inf')
+            return (rank(filepath) if rank else 0, mtime, filepath)
+        return min(files, key=key)
+
+    def reclaim(self, files: List[str], action: str, quarantine_dir: str = None,
+                root: str = None, keeper: str = None) -> Tuple[int, List[str]]:
+        """
+        Reclaim space from one duplicate group
+        keeper (default: choose_keeper) is kept; every other copy is verified
+        byte-for-byte against it and then replaced by a hardlink/reflink to it,
+        or moved under quarantine_dir (keeping its path relative to root)
+        Returns (bytes reclaimed, redundant files handled)
+        """
+        keeper = keeper or self.choose_keeper(files)
+        reclaimed = 0
+        handled = []
+
+        for redundant in files:
+            if redundant == keeper:
+                continue
+            try:
+                if not filecmp.cmp(keeper, redundant, shallow=False):
+                    print(f"  ! {redundant}: content differs from {keeper}, skipped")
+                    continue
+
+                size = os.path.getsize(redundant)
+                tmp_path = f"{redundant}.dedupe-tmp"
+
+                if action == 'hardlink':
+                    os.link(keeper, tmp_path)
+                    os.replace(tmp_path, redundant)
+                elif action == 'reflink':
+                    import fcntl
+                    try:
+                        with open(keeper, 'rb') as src, open(tmp_path, 'wb') as dst:
+                            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+                        shutil.copystat(redundant, tmp_path)
+                        os.replace(tmp_path, redundant)
+                    except OSError:
+                        if os.path.exists(tmp_path):
+                            os.remove(tmp_path)
+                        raise
+                elif action == 'quarantine':
+                    rel_path = os.path.relpath(redundant, root) if root else os.path.basename(redundant)
+                    dest = os.path.join(quarantine_dir, rel_path)
+                    os.makedirs(os.path.dirname(dest), exist_ok=True)
+                    shutil.move(redundant, dest)
+                else:
+                    continue
+
+                reclaimed += size
+                handled.append(redundant)
+
+            except OSError as e:
+                print(f"  ! {redundant}: {action} failed: {e}")
+
+        return reclaimed, handled
+
     def check_duplicate(self, source_file: str, target_directory: str) -> Optional[str]:
         """
         Check if a file already exists in the target directory
@@ -184,6 +435,7 @@ class DuplicateChecker:
                 # Quick check: size must match
                 if os.path.getsize(target_file) != source_size:
                     continue
+                self.counters['size_matches'] += 1
 
                 # Calculate source hash if not done yet
                 if source_hash is None:
@@ -194,10 +446,54 @@ class DuplicateChecker:
                 # Check hash
                 target_hash = self.calculate_hash(target_file)
                 if target_hash == source_hash:
+                    self.counters['hash_matches'] += 1
                     return target_file
 
         return None
 
+    def check_duplicates(self, pairs: List[Tuple[str, str]],
+                         target_directory: str) -> Dict[str, Optional[str]]:
+        """
+        Batch version of check_duplicate for files going into one directory
+        pairs: (source file, planned target path) in processing order
+        The directory is walked once; sources that are not duplicates are
+        treated as present at their planned target for the sources after them
+        Returns {source: duplicate path or None}
+        """
+        by_size = defaultdict(list)
+        if os.path.isdir(target_directory):
+            for root, dirs, files in os.walk(target_directory):
+                for filename in files:
+                    target_file = os.path.join(root, filename)
+                    try:
+                        by_size[os.path.getsize(target_file)].append((target_file, target_file))
+                    except OSError:
+                        continue
+
+        results = {}
+        for source_file, target_path in pairs:
+            results[source_file] = None
+            try:
+                source_size = os.path.getsize(source_file)
+            except OSError:
+                continue
+
+            candidates = by_size.get(source_size, [])
+            if candidates:
+                self.counters['size_matches'] += len(candidates)
+                source_hash = self.calculate_hash(source_file)
+                for display_path, hash_path in candidates:
+                    if source_hash and self.calculate_hash(hash_path) == source_hash:
+                        self.counters['hash_matches'] += 1
+                        results[source_file] = display_path
+                        break
+
+            if results[source_file] is None:
+                # Later sources compare against this one's content (not copied yet)
+                by_size[source_size].append((target_path, source_file))
+
+        return results
+
     def get_duplicate_stats(self, duplicates: Dict[str, List[str]]) -> Dict:
         """
         Get statistics about duplicates
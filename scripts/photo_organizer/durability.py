@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Durability Module
+Group commit for library copies: written files and their directories are
+fsynced together (every N files or MB) instead of one at a time, and only
+synced copies are handed back to be recorded as complete. Optionally each
+synced copy is re-read from disk and checked against its source digest
+"""
+
+import os
+import time
+import hashlib
+from typing import List, Optional, Tuple
+
+
+DURABILITY_POLICIES = ('none', 'batch', 'each')
+
+
+def fsync_path(path: str, directory: bool = False):
+    """fsync a file or directory by path"""
+    fd = os.open(path, os.O_RDONLY | (getattr(os, 'O_DIRECTORY', 0) if directory else 0))
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def hash_from_disk(path: str, drop_cache: bool = True, chunk_size: int = 1024 * 1024) -> Optional[str]:
+    """
+    MD5 of a file as stored on disk
+    drop_cache: Evict the (already synced, so clean) cached pages first, so
+                the read comes from the device and not from what we just wrote
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return None
+    try:
+        if drop_cache and hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        hasher = hashlib.md5()
+        while True:
+            chunk = os.read(fd, chunk_size)
+            if not chunk:
+                break
+            hasher.update(chunk)
+        return hasher.hexdigest()
+    except OSError:
+        return None
+    finally:
+        os.close(fd)
+
+
+class CopySyncer:
+    """Batch fsync (and optional verification) of files copied into the library"""
+
+    def __init__(self, policy: str = 'batch', max_files: int = 100, max_mb: float = 256,
+                 verify: bool = False):
+        """
+        Args:
+            policy: 'none' (no fsync), 'batch' (group commit) or 'each' (per file)
+            max_files: Sync a batch after this many files
+            max_mb: ... or after this many MB written
+            verify: Re-read each copy and compare with its source digest
+        """
+        if policy not in DURABILITY_POLICIES:
+            raise ValueError(f"Unknown durability policy '{policy}'")
+        self.policy = policy
+        self.max_files = max_files if policy == 'batch' else 1
+        self.max_bytes = max_mb * 1024 * 1024
+        self.verify = verify
+
+        # (path, digest, size, payload) waiting for the next sync
+        self.pending = []
+        self.pending_bytes = 0
+        # Directories already synced into their parent (new year folders)
+        self.known_dirs = set()
+
+        self.stats = {
+            'syncs': 0,
+            'files_synced': 0,
+            'sync_seconds': 0.0,
+            'verified': 0,
+            'verify_failed': 0,
+        }
+
+    def add(self, path: str, digest: str, size: int, payload=None) -> Tuple[List, List]:
+        """
+        Register a written copy
+        Returns (complete, failed) payload lists that became final with this call
+        """
+        self.pending.append((path, digest, size, payload))
+        self.pending_bytes += size
+        if len(self.pending) >= self.max_files or self.pending_bytes >= self.max_bytes:
+            return self.flush()
+        return [], []
+
+    def flush(self) -> Tuple[List, List]:
+        """Sync everything pending; returns (complete, failed) payloads"""
+        if not self.pending:
+            return [], []
+        pending, self.pending, self.pending_bytes = self.pending, [], 0
+
+        if self.policy != 'none':
+            start = time.monotonic()
+            directories = []
+            try:
+                for path, _, _, _ in pending:
+                    fsync_path(path)
+                    directory = os.path.dirname(path)
+                    if directory not in directories:
+                        directories.append(directory)
+
+                # Directory entries of the new files, and new directories in their parents
+                for directory in directories:
+                    fsync_path(directory, directory=True)
+                    if directory not in self.known_dirs:
+                        fsync_path(os.path.dirname(directory), directory=True)
+                        self.known_dirs.add(directory)
+            except OSError as e:
+                # Nothing in this group is known to be on disk
+                print(f"Error: fsync failed, {len(pending)} copies not recorded: {e}")
+                return [], [payload for _, _, _, payload in pending]
+
+            self.stats['syncs'] += 1
+            self.stats['files_synced'] += len(pending)
+            self.stats['sync_seconds'] += time.monotonic() - start
+
+        complete, failed = [], []
+        for path, digest, size, payload in pending:
+            if self.verify:
+                # Without a sync the pages are dirty and stay cached: this
+                # then only checks the copy itself, not the medium
+                if hash_from_disk(path, drop_cache=self.policy != 'none') != digest:
+                    self.stats['verify_failed'] += 1
+                    failed.append(payload)
+                    continue
+                self.stats['verified'] += 1
+            complete.append(payload)
+
+        return complete, failed
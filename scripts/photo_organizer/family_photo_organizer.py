@@ -8,25 +8,68 @@ This is a universal tool for all Samsung SmartSwitch users
 import os
 import sys
 import json
-import shutil
+import time
 import logging
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, Tuple, Iterator
 from collections import defaultdict
+from itertools import islice
 import argparse
-import exifread
-from PIL import Image
 
-# Import our modules
+# Import our modules (heavier ones are imported by the stage that needs them)
 from denote_namer import DenoteNamer
-from duplicate_checker import DuplicateChecker
+from duplicate_checker import DuplicateChecker, RECLAIM_ACTIONS
+from media_header import ThumbnailClassifier
+from library_index import LibraryIndex
+from metrics import Metrics
+from durability import CopySyncer, DURABILITY_POLICIES
+from sharding import (SHARD_MODES, parse_shard, shard_dir_name,
+                      select_backup_folders, in_hash_shard, unique_name)
+
+
+# Top-level library folders that organized files are filed under
+CATEGORY_FOLDERS = ('photos', 'videos', 'screenshots', 'documents')
+
+
+def walk_files(directory: str) -> Iterator[os.DirEntry]:
+    """Yield file entries below directory, depth-first in sorted name order"""
+    stack = [directory]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue
+
+        subdirs = []
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                yield entry
+        # Reversed so the stack pops subdirectories in sorted order
+        stack.extend(reversed(subdirs))
 
 
 class FamilyPhotoOrganizer:
     """Main organizer for processing SmartSwitch backups"""
 
-    def __init__(self, source_dir: str, target_dir: str, dry_run: bool = False):
+    # Files per metadata batch (GPS lookups are resolved per batch)
+    BATCH_SIZE = 500
+
+    # Parallel directory walks in structure analysis (I/O bound)
+    ANALYZE_WORKERS = 4
+
+    def __init__(self, source_dir: str, target_dir: str, dry_run: bool = False,
+                 gazetteer: str = None, shard: Tuple[int, int] = None,
+                 shard_by: str = 'hash', low_memory: bool = False,
+                 cache_entries: int = 10000, bursts: bool = False,
+                 burst_tag: bool = False, burst_perceptual: bool = False,
+                 metrics_file: str = None, metrics_port: int = None,
+                 metrics_interval: float = 15, durability: str = 'batch',
+                 sync_files: int = 100, sync_mb: float = 256, verify: bool = False):
         """
         Initialize the organizer
 
@@ -34,17 +77,72 @@ class FamilyPhotoOrganizer:
             source_dir: SmartSwitch backup directory (e.g., SM-S921N_xxx)
             target_dir: Target directory for organized files
             dry_run: If True, don't actually move files
+            gazetteer: Optional GeoNames-style gazetteer file for offline place tags
+            shard: (K, N) to process only shard K of N; output is staged in
+                   <target>/shards/shard-K-of-N for a later merge
+            shard_by: 'hash' (path hash; folder hash with bursts) or 'folder'
+                      (backup folders round-robin)
+            low_memory: Stream files instead of listing them up front, keep at most
+                        cache_entries hashes in memory (SQLite-backed cache) and
+                        journal index additions instead of loading the index
+            bursts: Detect burst/motion-photo sequences and process each as one unit
+            burst_tag: Tag burst members other than the representative with __burst
+            burst_perceptual: Also compare perceptual hashes when grouping bursts
+            metrics_file: Prometheus textfile rewritten every metrics_interval seconds
+            metrics_port: Serve live metrics on http://127.0.0.1:<port>/metrics
+            durability: 'none', 'batch' (fsync copies and directories every sync_files
+                        files / sync_mb MB) or 'each' (fsync every copy)
+            verify: Re-read synced copies and compare them with the source digest
         """
         self.source_dir = Path(source_dir)
         self.target_dir = Path(target_dir)
         self.dry_run = dry_run
+        self.shard = shard
+        self.shard_by = shard_by
+        self.low_memory = low_memory
+        self.run_id = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+        if shard:
+            self.target_dir = self.target_dir / "shards" / shard_dir_name(*shard)
+
+        # Planned copies (source, target relative paths), streamed per shard
+        self.plan_log = None
+
+        # Files skipped during enumeration, streamed to logs/excluded_*.tsv
+        self.excluded_file = None
+        self.excluded_log = None
 
         # Initialize modules
         self.namer = DenoteNamer()
+        self.thumbnail_classifier = ThumbnailClassifier()
         self.duplicate_checker = DuplicateChecker(
-            cache_file=str(self.target_dir / "logs" / "duplicate_cache.json")
+            cache_file=str(self.target_dir / "logs" / "duplicate_cache.json"),
+            max_cache_entries=cache_entries if low_memory else None
         )
 
+        # Copies are recorded as complete only after they are synced
+        self.syncer = CopySyncer(durability, max_files=sync_files, max_mb=sync_mb, verify=verify)
+
+        # Burst/sequence grouping
+        self.burst_detector = None
+        self.burst_tag = burst_tag
+        if bursts:
+            from burst_detector import BurstDetector
+            self.burst_detector = BurstDetector(perceptual=burst_perceptual)
+
+        # Live metrics (exported only while process_all runs)
+        self.metrics = Metrics()
+        self.metrics_file = metrics_file
+        self.metrics_port = metrics_port
+        self.metrics_interval = metrics_interval
+        self.started = None
+        self.setup_metrics()
+
+        # Loaded on first use, so --analyze-only never reads them
+        self.gazetteer = gazetteer
+        self._gps_tagger = None
+        self._library_index = None
+
         # Setup logging
         self.setup_logging()
 
@@ -57,15 +155,97 @@ class FamilyPhotoOrganizer:
             'by_type': defaultdict(int),
             'by_year': defaultdict(int),
             'by_folder': defaultdict(int),
+            'by_place': defaultdict(int),
+            'excluded': defaultdict(int),
+            'bursts': 0,
+            'burst_files': 0,
             'size_saved': 0
         }
 
+    def setup_metrics(self):
+        """Declare metrics; file counts and hashing totals are collected at render time"""
+        m = self.metrics
+        m.declare('files_total', 'counter', 'Files handled by result')
+        m.declare('bytes_read_total', 'counter', 'Bytes read from disk by purpose')
+        m.declare('bytes_written_total', 'counter', 'Bytes copied into the library')
+        m.declare('hash_seconds_total', 'counter', 'Seconds spent reading and hashing (copies included)')
+        m.declare('hash_mb_per_second', 'gauge', 'Average hashing throughput of this run (copies included)')
+        m.declare('hash_cache_hits_total', 'counter', 'Hashes served from the duplicate cache')
+        m.declare('duplicate_candidates_total', 'counter',
+                  'Duplicate checks passing each tier (size match, then hash match)')
+        m.declare('exif_parse_seconds', 'histogram', 'EXIF parse latency per file')
+        m.declare('file_process_seconds', 'histogram', 'Hash, duplicate check and copy time per unit')
+        m.declare('batch_pending_files', 'gauge', 'Files of the current batch not processed yet')
+        m.declare('batch_carried_files', 'gauge', 'Files held back for the next batch (open burst)')
+        m.declare('total_files', 'gauge', 'Media files found (so far, in low-memory mode)')
+        m.declare('current_file_info', 'gauge', 'File being processed')
+        m.declare('last_progress_timestamp_seconds', 'gauge', 'Unix time the last file finished')
+        m.declare('start_timestamp_seconds', 'gauge', 'Unix time the run started')
+        m.declare('fsync_batches_total', 'counter', 'Group commits (fsync of pending copies and directories)')
+        m.declare('fsync_seconds_total', 'counter', 'Seconds spent in fsync')
+        m.declare('verify_failures_total', 'counter', 'Copies that did not match their source after sync')
+        m.collectors.append(self.collect_metrics)
+
+    def collect_metrics(self, metrics: Metrics):
+        """Copy organizer and duplicate-checker counters into the registry"""
+        excluded = sum(list(self.stats['excluded'].values()))
+        for result, value in (('copied', self.stats['processed']),
+                              ('duplicate', self.stats['duplicates']),
+                              ('error', self.stats['errors']),
+                              ('excluded', excluded)):
+            metrics.set('files_total', value, result=result)
+        metrics.set('total_files', self.stats['total_files'])
+
+        counters = self.duplicate_checker.counters
+        # Copies are hashed as they are read: those bytes count under purpose="copy"
+        metrics.set('bytes_read_total', counters['hash_bytes'] - counters['copy_hash_bytes'], purpose='hash')
+        metrics.set('hash_seconds_total', counters['hash_seconds'])
+        metrics.set('hash_cache_hits_total', counters['hash_cache_hits'])
+        metrics.set('duplicate_candidates_total', counters['size_matches'], tier='size')
+        metrics.set('duplicate_candidates_total', counters['hash_matches'], tier='hash')
+        syncer = self.syncer.stats
+        metrics.set('fsync_batches_total', syncer['syncs'])
+        metrics.set('fsync_seconds_total', round(syncer['sync_seconds'], 6))
+        metrics.set('verify_failures_total', syncer['verify_failed'])
+
+        if counters['hash_seconds'] > 0:
+            mb_per_second = counters['hash_bytes'] / counters['hash_seconds'] / (1024 * 1024)
+            metrics.set('hash_mb_per_second', round(mb_per_second, 2))
+
+    def start_metrics(self):
+        """Start the textfile writer and/or HTTP endpoint if requested"""
+        self.started = time.monotonic()
+        self.metrics.set('start_timestamp_seconds', int(time.time()))
+        if self.metrics_file:
+            self.metrics.start_textfile(self.metrics_file, self.metrics_interval)
+            self.logger.info(f"Writing metrics to {self.metrics_file} every {self.metrics_interval:g}s")
+        if self.metrics_port is not None:
+            host, port = self.metrics.start_http(self.metrics_port)
+            self.logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+
+    @property
+    def library_index(self) -> LibraryIndex:
+        """Library digest index (journal-only in low-memory mode)"""
+        if self._library_index is None:
+            self._library_index = LibraryIndex(str(self.target_dir), append_only=self.low_memory,
+                                               durable=self.syncer.policy != 'none')
+        return self._library_index
+
+    @property
+    def gps_tagger(self):
+        """Offline place tagger (index is built once and cached next to the gazetteer)"""
+        if self._gps_tagger is None and self.gazetteer:
+            from gps_tagger import GpsTagger
+            self._gps_tagger = GpsTagger(self.gazetteer)
+            self.logger.info(f"Loaded gazetteer index: {len(self._gps_tagger.index.names)} places")
+        return self._gps_tagger
+
     def setup_logging(self):
         """Setup logging configuration"""
         log_dir = self.target_dir / "logs"
         log_dir.mkdir(parents=True, exist_ok=True)
 
-        log_file = log_dir / f"organize_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
+        log_file = log_dir / f"organize_{self.run_id}.log"
 
         logging.basicConfig(
             level=logging.INFO,
@@ -82,8 +262,14 @@ class FamilyPhotoOrganizer:
     def analyze_smartswitch_structure(self) -> Dict:
         """
         Analyze SmartSwitch backup structure
+        Directory summaries are cached in logs/structure_cache.json and reused
+        while the directory mtime is unchanged; top-level folders of the
+        backups are walked in parallel
         Returns a dictionary with structure information
         """
+        from concurrent.futures import ThreadPoolExecutor
+        from structure_cache import StructureCache
+
         structure = {
             'backup_info': {},
             'folders': {},
@@ -107,13 +293,35 @@ class FamilyPhotoOrganizer:
 
         # Find all backup timestamp folders (e.g., 1757590576343)
         backup_folders = []
-        for item in self.source_dir.iterdir():
+        other_dirs = []
+        for item in sorted(self.source_dir.iterdir()):
             if item.is_dir() and item.name.isdigit() and len(item.name) == 13:
                 backup_folders.append(item)
+            elif item.is_dir():
+                other_dirs.append(item)
 
         self.logger.info(f"Found {len(backup_folders)} backup folders")
 
-        # Analyze each backup folder
+        start = time.monotonic()
+        cache = StructureCache(str(self.target_dir / "logs" / "structure_cache.json"))
+
+        # One task per top-level folder of every backup (one backup is common,
+        # so per-backup tasks alone would not run in parallel). Everything is
+        # walked, so backup_media.db is found without a second pass
+        media_db = [os.path.join(self.source_dir, name)
+                    for name in cache.scan_dir(str(self.source_dir))['media_db']]
+        tasks = []
+        for backup_folder in backup_folders:
+            entry = cache.scan_dir(str(backup_folder))
+            media_db.extend(os.path.join(backup_folder, name) for name in entry['media_db'])
+            tasks.extend((backup_folder, name) for name in entry['dirs'])
+
+        with ThreadPoolExecutor(max_workers=self.ANALYZE_WORKERS) as executor:
+            summaries = list(executor.map(
+                lambda task: cache.summarize(str(task[0] / task[1])), tasks))
+            others = list(executor.map(
+                lambda folder: cache.summarize(str(folder), depth=0), other_dirs))
+
         for backup_folder in backup_folders:
             backup_timestamp = int(backup_folder.name) / 1000
             backup_date = datetime.fromtimestamp(backup_timestamp)
@@ -123,33 +331,44 @@ class FamilyPhotoOrganizer:
                 'folders': {}
             }
 
-            # Check known folders
-            for folder_name in known_folders:
-                folder_path = backup_folder / folder_name
-                if folder_path.exists():
-                    file_count = sum(1 for _ in folder_path.rglob('*') if _.is_file())
-                    folder_size = sum(f.stat().st_size for f in folder_path.rglob('*') if f.is_file())
+        # Known folders of each backup, with per-extension and per-subfolder breakdowns
+        for (backup_folder, folder_name), summary in zip(tasks, summaries):
+            media_db.extend(summary['media_db'])
+            if folder_name not in known_folders:
+                continue
+
+            structure['backup_info'][backup_folder.name]['folders'][folder_name] = {
+                'files': summary['files'],
+                'size': summary['size'],
+                'extensions': dict(summary['extensions'].most_common()),
+                'subfolders': summary['subfolders'],
+            }
+
+            structure['total_files'] += summary['files']
+            structure['total_size'] += summary['size']
+            for ext, count in summary['extensions'].items():
+                structure['file_types'][ext or '(none)'] += count
 
-                    structure['backup_info'][backup_folder.name]['folders'][folder_name] = {
-                        'files': file_count,
-                        'size': folder_size
-                    }
+        for summary in others:
+            media_db.extend(summary['media_db'])
 
-                    structure['total_files'] += file_count
-                    structure['total_size'] += folder_size
+        cache.save(prune_under=str(self.source_dir))
+        self.logger.info(f"Analyzed {cache.stats['scanned'] + cache.stats['reused']} directories "
+                         f"({cache.stats['reused']} unchanged, from cache) in {time.monotonic() - start:.2f}s")
 
-        # Find backup_media.db if exists
-        db_files = list(self.source_dir.glob('**/backup_media.db'))
-        if db_files:
-            structure['media_db'] = str(db_files[0])
-            self.logger.info(f"Found media database: {db_files[0]}")
+        # backup_media.db if exists
+        if media_db:
+            structure['media_db'] = sorted(media_db)[0]
+            self.logger.info(f"Found media database: {structure['media_db']}")
 
         return structure
 
-    def get_media_files(self) -> List[Path]:
+    def iter_media_files(self) -> Iterator[str]:
         """
-        Get all media files from SmartSwitch backup
-        Filters by size (>100KB) to exclude thumbnails
+        Yield media file paths from SmartSwitch backup (plain strings, compact
+        while queued; later stages stat the files themselves)
+        Walks directories in sorted order (deterministic across hosts) and
+        excludes thumbnails/cached previews by header dimensions and path hints
         """
         media_extensions = {
             # Photos
@@ -160,14 +379,17 @@ class FamilyPhotoOrganizer:
             # Documents that might be photos of documents
         }
 
-        media_files = []
-        min_size = 100 * 1024  # 100KB minimum
+        backup_folders = sorted(p for p in self.source_dir.iterdir() if p.is_dir())
+        if self.shard and self.shard_by == 'folder':
+            if len(backup_folders) < self.shard[1]:
+                self.logger.warning(f"Only {len(backup_folders)} backup folders for {self.shard[1]} shards: "
+                                    f"some shards get nothing, use --shard-by hash")
+            backup_folders = select_backup_folders(backup_folders, *self.shard)
+            self.logger.info(f"Shard {self.shard[0]}/{self.shard[1]}: "
+                             f"{', '.join(p.name for p in backup_folders) or 'no backup folders'}")
 
         # Search in all backup folders
-        for backup_folder in self.source_dir.iterdir():
-            if not backup_folder.is_dir():
-                continue
-
+        for backup_folder in backup_folders:
             # Search in common media locations
             search_dirs = [
                 backup_folder / 'PHOTO',
@@ -177,34 +399,84 @@ class FamilyPhotoOrganizer:
             ]
 
             for search_dir in search_dirs:
-                if search_dir.exists():
-                    for file_path in search_dir.rglob('*'):
-                        if file_path.is_file():
-                            # Check extension
-                            if file_path.suffix.lower() in media_extensions:
-                                # Check size
-                                if file_path.stat().st_size >= min_size:
-                                    media_files.append(file_path)
-
-        self.logger.info(f"Found {len(media_files)} media files (>100KB)")
+                if not search_dir.is_dir():
+                    continue
+
+                for entry in walk_files(str(search_dir)):
+                    # Check extension
+                    if os.path.splitext(entry.name)[1].lower() not in media_extensions:
+                        continue
+
+                    file_path = Path(entry.path)
+
+                    # Check hash shard before touching the file. Bursts are
+                    # grouped within a folder, so then the folder picks the shard
+                    if self.shard and self.shard_by == 'hash':
+                        shard_key = file_path.parent if self.burst_detector else file_path
+                        rel_path = shard_key.relative_to(self.source_dir).as_posix()
+                        if not in_hash_shard(rel_path, *self.shard):
+                            continue
+
+                    st = entry.stat()
+
+                    # Check thumbnail (header dimensions + path hints)
+                    excluded = self.thumbnail_classifier.classify(
+                        file_path,
+                        file_path.relative_to(backup_folder),
+                        st.st_size
+                    )
+                    if excluded:
+                        self.record_excluded(file_path, *excluded)
+                        continue
+
+                    yield entry.path
+
+    def get_media_files(self) -> List[Path]:
+        """
+        Get all media files from SmartSwitch backup
+        Excludes thumbnails/cached previews by header dimensions and path hints
+        """
+        media_files = [Path(path) for path in self.iter_media_files()]
+        excluded = sum(self.stats['excluded'].values())
+        self.logger.info(f"Found {len(media_files)} media files ({excluded} thumbnails/previews excluded)")
         return media_files
 
+    def record_excluded(self, file_path: Path, reason: str, detail: str):
+        """Count an excluded file and stream it to the exclusions TSV"""
+        self.stats['excluded'][reason] += 1
+        self.logger.debug(f"Excluded {file_path}: {reason} ({detail})")
+
+        if self.excluded_log is None:
+            self.excluded_file = self.target_dir / "logs" / f"excluded_{self.run_id}.tsv"
+            self.excluded_log = open(self.excluded_file, 'w', encoding='utf-8')
+            self.excluded_log.write("path\treason\tdetail\n")
+        self.excluded_log.write(f"{file_path}\t{reason}\t{detail}\n")
+
     def extract_metadata(self, file_path: Path) -> Dict:
         """
         Extract metadata from file using EXIF and other methods
         """
         metadata = {
             'datetime': None,
+            'datetime_source': None,
             'gps': None,
+            'place': None,
             'camera': None,
             'original_name': file_path.name,
             'folder_path': str(file_path.parent.relative_to(self.source_dir))
         }
 
+        # Imported on first use (startup cost), but outside the try below:
+        # a missing dependency must fail the run, not silently drop EXIF dates
+        import exifread
+        from gps_tagger import gps_to_decimal
+
         # Try to extract EXIF data
         try:
             with open(file_path, 'rb') as f:
+                start = time.monotonic()
                 tags = exifread.process_file(f, stop_tag='EXIF DateTimeOriginal')
+                self.metrics.observe('exif_parse_seconds', time.monotonic() - start)
 
                 # Extract datetime
                 for tag in ['EXIF DateTimeOriginal', 'EXIF DateTimeDigitized', 'Image DateTime']:
@@ -212,16 +484,17 @@ class FamilyPhotoOrganizer:
                         dt_str = str(tags[tag])
                         try:
                             metadata['datetime'] = datetime.strptime(dt_str, '%Y:%m:%d %H:%M:%S')
+                            metadata['datetime_source'] = 'exif'
                             break
                         except:
                             pass
 
-                # Extract GPS if available
+                # Extract GPS if available (decimal degrees)
                 if 'GPS GPSLatitude' in tags and 'GPS GPSLongitude' in tags:
-                    metadata['gps'] = {
-                        'lat': str(tags['GPS GPSLatitude']),
-                        'lon': str(tags['GPS GPSLongitude'])
-                    }
+                    lat = gps_to_decimal(tags['GPS GPSLatitude'], tags.get('GPS GPSLatitudeRef'))
+                    lon = gps_to_decimal(tags['GPS GPSLongitude'], tags.get('GPS GPSLongitudeRef'))
+                    if lat is not None and lon is not None:
+                        metadata['gps'] = {'lat': lat, 'lon': lon}
 
                 # Extract camera info
                 if 'Image Make' in tags and 'Image Model' in tags:
@@ -231,17 +504,37 @@ class FamilyPhotoOrganizer:
             self.logger.debug(f"Could not extract EXIF from {file_path}: {e}")
 
         # Fallback to filename parsing or file modification time
+        if not metadata['datetime']:
+            metadata['datetime'] = self.namer.extract_datetime(str(file_path), fallback_to_mtime=False)
+            metadata['datetime_source'] = 'filename'
         if not metadata['datetime']:
             metadata['datetime'] = self.namer.extract_datetime(str(file_path))
+            metadata['datetime_source'] = 'mtime' if metadata['datetime'] else None
 
         return metadata
 
+    def extract_metadata_batch(self, files: List[Path]) -> List[Dict]:
+        """
+        Extract metadata for a batch of files and resolve place tags in one lookup
+        """
+        metadata_list = [self.extract_metadata(file_path) for file_path in files]
+
+        if self.gps_tagger:
+            places = self.gps_tagger.tag_batch([m['gps'] for m in metadata_list])
+            for metadata, place in zip(metadata_list, places):
+                metadata['place'] = place
+
+        return metadata_list
+
     def determine_target_path(self, source_file: Path, metadata: Dict) -> Path:
         """
         Determine target path based on file type and metadata
         """
-        # Generate Denote filename
-        denote_name = self.namer.generate_denote_name(str(source_file))
+        # Generate Denote filename (place tag from GPS if resolved, burst tag)
+        extra_tags = [metadata['place']] if metadata.get('place') else []
+        if metadata.get('burst'):
+            extra_tags.append('burst')
+        denote_name = self.namer.generate_denote_name(str(source_file), extra_tags=extra_tags)
 
         # Determine category folder
         ext = source_file.suffix.lower()
@@ -270,14 +563,16 @@ class FamilyPhotoOrganizer:
 
         return target_path
 
-    def process_file(self, source_file: Path) -> bool:
+    def process_file(self, source_file: Path, metadata: Dict = None) -> bool:
         """
         Process a single file
+        metadata: Pre-extracted metadata (from extract_metadata_batch), extracted if None
         Returns True if successful, False otherwise
         """
         try:
             # Extract metadata
-            metadata = self.extract_metadata(source_file)
+            if metadata is None:
+                metadata = self.extract_metadata(source_file)
 
             # Determine target path
             target_path = self.determine_target_path(source_file, metadata)
@@ -295,32 +590,14 @@ class FamilyPhotoOrganizer:
                     self.stats['size_saved'] += source_file.stat().st_size
                     return True  # Consider it successful, just skip
 
-            # Create target directory
+                # Same name, different content already in the library
+                if target_path.exists():
+                    target_path = unique_name(target_path, lambda p: p.exists())
+
+            # Create target directory and copy
             if not self.dry_run:
                 target_path.parent.mkdir(parents=True, exist_ok=True)
-
-                # Copy file
-                shutil.copy2(source_file, target_path)
-                self.logger.info(f"Copied: {source_file.name} -> {target_path}")
-            else:
-                self.logger.info(f"[DRY RUN] Would copy: {source_file.name} -> {target_path}")
-
-            # Update statistics
-            self.stats['processed'] += 1
-
-            # Update by type
-            if target_path.suffix.lower() in self.namer.video_extensions:
-                self.stats['by_type']['videos'] += 1
-            else:
-                self.stats['by_type']['photos'] += 1
-
-            # Update by year
-            year = target_path.parent.name
-            self.stats['by_year'][year] += 1
-
-            # Update by source folder
-            source_folder = source_file.parent.name
-            self.stats['by_folder'][source_folder] += 1
+            self.copy_to_library(source_file, target_path, metadata)
 
             return True
 
@@ -329,6 +606,157 @@ class FamilyPhotoOrganizer:
             self.stats['errors'] += 1
             return False
 
+    def copy_to_library(self, source_file: Path, target_path: Path, metadata: Dict):
+        """
+        Copy one file into the library
+        It is recorded (index, plan, stats) once the durability policy has synced
+        (and optionally verified) it, see finish_copies
+        """
+        if self.dry_run:
+            self.logger.info(f"[DRY RUN] Would copy: {source_file.name} -> {target_path}")
+            self.record_processed(source_file, target_path, metadata)
+            return
+
+        # Copy file, hashing it in the same pass: the digest is recorded for
+        # later integrity scrubs and is what post-copy verification checks against
+        source_hash, copied = self.duplicate_checker.copy_with_hash(str(source_file), str(target_path))
+        self.logger.info(f"Copied: {source_file.name} -> {target_path}")
+        self.metrics.inc('bytes_read_total', copied, purpose='copy')
+        self.metrics.inc('bytes_written_total', copied)
+
+        self.finish_copies(*self.syncer.add(str(target_path), source_hash, copied,
+                                            (source_file, target_path, metadata, source_hash)))
+
+    def finish_copies(self, complete: List[Tuple], failed: List[Tuple]):
+        """Record synced copies as complete; remove copies that failed verification"""
+        for source_file, target_path, metadata, source_hash in complete:
+            target_stat = target_path.stat()
+            self.library_index.add(str(target_path), source_hash,
+                                   target_stat.st_size, target_stat.st_mtime)
+            self.record_processed(source_file, target_path, metadata)
+
+        for source_file, target_path, metadata, source_hash in failed:
+            self.logger.error(f"Copy not durable or does not match source: {source_file} -> {target_path}")
+            self.stats['errors'] += 1
+            try:
+                target_path.unlink()
+            except OSError:
+                pass
+
+        if complete and self.syncer.policy != 'none':
+            self.library_index.sync()
+
+    def record_processed(self, source_file: Path, target_path: Path, metadata: Dict):
+        """Update plan and statistics for a copied file"""
+        if self.shard:
+            if self.plan_log is None:
+                self.plan_log = open(self.target_dir / "plan.jsonl", 'w', encoding='utf-8')
+            self.plan_log.write(json.dumps({
+                'source': source_file.relative_to(self.source_dir).as_posix(),
+                'target': target_path.relative_to(self.target_dir).as_posix(),
+            }, ensure_ascii=False) + "\n")
+
+        # Update statistics
+        self.stats['processed'] += 1
+
+        # Update by type
+        if target_path.suffix.lower() in self.namer.video_extensions:
+            self.stats['by_type']['videos'] += 1
+        else:
+            self.stats['by_type']['photos'] += 1
+
+        # Update by year
+        year = target_path.parent.name
+        self.stats['by_year'][year] += 1
+
+        # Update by source folder
+        source_folder = source_file.parent.name
+        self.stats['by_folder'][source_folder] += 1
+
+        # Update by place
+        if metadata.get('place'):
+            self.stats['by_place'][metadata['place']] += 1
+
+    def process_burst(self, files: List[Path], metadata_list: List[Dict]) -> bool:
+        """
+        Process a burst as one unit: one duplicate lookup per target directory,
+        collision-free names within the burst, then the copies back to back
+        Returns True if every file was handled
+        """
+        representative = self.burst_detector.representative(files)
+        self.stats['bursts'] += 1
+        self.stats['burst_files'] += len(files)
+        self.logger.info(f"Burst of {len(files)} files in {files[0].parent.name}, "
+                         f"representative {files[representative].name}")
+
+        # Plan target paths; Denote names of one burst collide easily
+        targets = []
+        taken = set()
+        for i, (source_file, metadata) in enumerate(zip(files, metadata_list)):
+            if self.burst_tag and i != representative:
+                metadata['burst'] = True
+            target_path = self.determine_target_path(source_file, metadata)
+            if target_path in taken:
+                target_path = unique_name(target_path, lambda p: p in taken or p.exists())
+            taken.add(target_path)
+            targets.append(target_path)
+
+        # One directory lookup per distinct target directory
+        duplicates = {}
+        by_dir = defaultdict(list)
+        for source_file, target_path in zip(files, targets):
+            by_dir[target_path.parent].append((str(source_file), str(target_path)))
+        for target_dir, pairs in by_dir.items():
+            duplicates.update(self.duplicate_checker.check_duplicates(pairs, str(target_dir)))
+            if not self.dry_run:
+                target_dir.mkdir(parents=True, exist_ok=True)
+
+        ok = True
+        for source_file, target_path, metadata in zip(files, targets, metadata_list):
+            try:
+                duplicate = duplicates.get(str(source_file))
+                if duplicate:
+                    self.logger.info(f"Duplicate found: {source_file.name} -> {duplicate}")
+                    self.stats['duplicates'] += 1
+                    self.stats['size_saved'] += source_file.stat().st_size
+                    continue
+
+                # Same name, different content already in the library
+                if target_path.exists():
+                    target_path = unique_name(target_path, lambda p: p in taken or p.exists())
+                    taken.add(target_path)
+
+                self.copy_to_library(source_file, target_path, metadata)
+
+            except Exception as e:
+                self.logger.error(f"Error processing {source_file}: {e}")
+                self.stats['errors'] += 1
+                ok = False
+
+        return ok
+
+    def trailing_sequence(self, batch: List[Path], metadata_list: List[Dict]) -> int:
+        """
+        Start index of the time-contiguous run of files at the end of a batch
+        (same folder, capture times within the burst window); carried into the
+        next batch so a burst is never split at a batch boundary
+        At most one batch is carried, so memory stays bounded and progress
+        continues even through a folder of files sharing one capture time
+        """
+        detector = self.burst_detector
+        limit = max(len(batch) - self.BATCH_SIZE, 0)
+        j = len(batch)
+        if not detector.has_capture_time(metadata_list[-1]):
+            return j
+        j -= 1
+        while j > limit:
+            a, b = metadata_list[j - 1], metadata_list[j]
+            if (batch[j - 1].parent != batch[j].parent or not detector.has_capture_time(a)
+                    or abs((b['datetime'] - a['datetime']).total_seconds()) > detector.max_gap):
+                break
+            j -= 1
+        return j
+
     def process_all(self, limit: int = None):
         """
         Process all media files
@@ -336,29 +764,112 @@ class FamilyPhotoOrganizer:
         Args:
             limit: Process only this many files (for testing)
         """
-        # Get all media files
-        media_files = self.get_media_files()
+        # Enumerate media files (streamed in low-memory mode, so the total is unknown)
+        if self.low_memory:
+            media_files = self.iter_media_files()
+        else:
+            media_files = [Path(path) for path in self.iter_media_files()]
+            excluded = sum(self.stats['excluded'].values())
+            self.logger.info(f"Found {len(media_files)} media files ({excluded} thumbnails/previews excluded)")
+            self.stats['total_files'] = len(media_files)
 
         if limit:
-            media_files = media_files[:limit]
+            media_files = islice(media_files, limit)
             self.logger.info(f"Processing limited to {limit} files")
 
-        self.stats['total_files'] = len(media_files)
-
-        # Process each file
-        for i, media_file in enumerate(media_files, 1):
-            self.logger.info(f"Processing {i}/{len(media_files)}: {media_file.name}")
-            self.process_file(media_file)
-
-            # Progress report every 100 files
-            if i % 100 == 0:
-                self.print_progress()
+        self.start_metrics()
+        try:
+            self.process_batches(media_files)
+            self.finish_copies(*self.syncer.flush())
+        finally:
+            self.metrics.stop()
 
         # Final report
         self.print_final_report()
 
-        # Save duplicate cache
+        # Save duplicate cache and library index
         self.duplicate_checker.save_cache()
+        if self._library_index is not None:
+            self._library_index.save()
+
+        # Shard outputs for the merge step (index delta is the shard's library index)
+        if self.shard:
+            self.save_shard_outputs()
+
+    def process_batches(self, media_files):
+        """Extract metadata per batch, then process each file or burst"""
+        # Process in batches: metadata (and place lookups) per batch, then each file
+        media_files = iter(media_files)
+        total = '?' if self.low_memory else self.stats['total_files']
+        carry_files, carry_metadata = [], []
+        i = 0
+        while True:
+            new_files = [Path(f) for f in islice(media_files, self.BATCH_SIZE)]
+            if not new_files and not carry_files:
+                break
+            batch = carry_files + new_files
+            metadata_list = carry_metadata + self.extract_metadata_batch(new_files)
+            carry_files, carry_metadata = [], []
+
+            if self.burst_detector:
+                # A full batch may end mid-burst: hold its trailing sequence back
+                # (possibly the whole batch, which then grows with the next one)
+                if len(new_files) == self.BATCH_SIZE:
+                    cut = self.trailing_sequence(batch, metadata_list)
+                    carry_files, carry_metadata = batch[cut:], metadata_list[cut:]
+                    batch, metadata_list = batch[:cut], metadata_list[:cut]
+                groups = self.burst_detector.find_groups(batch, metadata_list)
+            else:
+                groups = [[j] for j in range(len(batch))]
+
+            self.metrics.set('batch_carried_files', len(carry_files))
+            pending = len(batch)
+            for group in groups:
+                previous = i
+                i += len(group)
+                if self.low_memory:
+                    self.stats['total_files'] = i
+                first = batch[group[0]]
+                self.metrics.set('batch_pending_files', pending)
+                self.metrics.replace('current_file_info', 1, path=str(first.relative_to(self.source_dir)))
+                start = time.monotonic()
+                if len(group) > 1:
+                    self.logger.info(f"Processing {previous + 1}-{i}/{total}: burst ({len(group)} files)")
+                    self.process_burst([batch[j] for j in group], [metadata_list[j] for j in group])
+                    self.metrics.observe('file_process_seconds', time.monotonic() - start, unit='burst')
+                else:
+                    self.logger.info(f"Processing {i}/{total}: {first.name}")
+                    self.process_file(first, metadata_list[group[0]])
+                    self.metrics.observe('file_process_seconds', time.monotonic() - start, unit='file')
+                pending -= len(group)
+                self.metrics.set('last_progress_timestamp_seconds', int(time.time()))
+
+                # Progress report every 100 files
+                if i // 100 > previous // 100:
+                    self.print_progress()
+
+        self.metrics.set('batch_pending_files', 0)
+        self.metrics.clear('current_file_info')
+
+    def save_shard_outputs(self):
+        """Write this shard's plan summary and statistics next to its staged files"""
+        if self.plan_log:
+            self.plan_log.close()
+            self.plan_log = None
+
+        with open(self.target_dir / "plan.json", 'w', encoding='utf-8') as f:
+            json.dump({
+                'source': str(self.source_dir),
+                'shard': list(self.shard),
+                'shard_by': self.shard_by,
+                'dry_run': self.dry_run,
+                'files': 'plan.jsonl',
+            }, f, ensure_ascii=False, indent=1)
+
+        with open(self.target_dir / "stats.json", 'w', encoding='utf-8') as f:
+            json.dump(self.stats, f, ensure_ascii=False, indent=2)
+
+        self.logger.info(f"Shard outputs written to {self.target_dir} (merge with: merge <target>)")
 
     def print_progress(self):
         """Print progress report"""
@@ -367,10 +878,20 @@ class FamilyPhotoOrganizer:
         duplicates = self.stats['duplicates']
         errors = self.stats['errors']
 
-        percent = (processed + duplicates + errors) / total * 100 if total > 0 else 0
+        if self.low_memory:
+            # Streaming: the total is not known until enumeration finishes
+            progress = f"{processed + duplicates + errors} files"
+        else:
+            percent = (processed + duplicates + errors) / total * 100 if total > 0 else 0
+            progress = f"{percent:.1f}%"
+
+        # Throughput since the start of processing
+        elapsed = time.monotonic() - self.started if self.started else 0
+        rate = (processed + duplicates + errors) / elapsed if elapsed > 0 else 0
+        written_mb = self.metrics.values.get(('bytes_written_total', ()), 0) / (1024 * 1024)
 
         self.logger.info(f"""
-        Progress: {percent:.1f}%
+        Progress: {progress} ({rate:.1f} files/s, {written_mb:.0f} MB written)
         Processed: {processed}/{total}
         Duplicates: {duplicates}
         Errors: {errors}
@@ -401,35 +922,281 @@ class FamilyPhotoOrganizer:
         for folder in sorted(self.stats['by_folder'].keys()):
             report += f"\n        - {folder}: {self.stats['by_folder'][folder]}"
 
+        syncer = self.syncer.stats
+        if syncer['syncs'] or syncer['verified'] or syncer['verify_failed']:
+            report += (f"\n\n        Durability ({self.syncer.policy}): {syncer['files_synced']} files "
+                       f"in {syncer['syncs']} syncs, {syncer['sync_seconds']:.1f}s fsync")
+            if self.syncer.verify:
+                report += f"\n        Verified: {syncer['verified']}, mismatched: {syncer['verify_failed']}"
+
+        if self.stats['bursts']:
+            report += f"\n\n        Bursts: {self.stats['bursts']} ({self.stats['burst_files']} files)"
+
+        if self.stats['by_place']:
+            report += "\n\n        By Place:"
+            for place in sorted(self.stats['by_place'].keys()):
+                report += f"\n        - {place}: {self.stats['by_place'][place]}"
+
         # Calculate space saved
         size_saved = self.stats['size_saved']
         size_saved_mb = size_saved / (1024 * 1024)
         report += f"\n\n        Space Saved (duplicates): {size_saved_mb:.2f} MB"
 
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+        # Excluded thumbnails/previews (full list was streamed to a separate TSV)
+        if self.excluded_log:
+            self.excluded_log.close()
+            self.excluded_log = None
+            report += f"\n\n        Excluded (not processed): {sum(self.stats['excluded'].values())}"
+            for reason in sorted(self.stats['excluded'].keys()):
+                report += f"\n        - {reason}: {self.stats['excluded'][reason]}"
+            report += f"\n        Details: {self.excluded_file}"
+
         report += "\n        ========================================"
 
         self.logger.info(report)
 
         # Save report to file
-        report_file = self.target_dir / "logs" / f"report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+        report_file = self.target_dir / "logs" / f"report_{timestamp}.txt"
         with open(report_file, 'w', encoding='utf-8') as f:
             f.write(report)
 
 
+def scrub_main(argv: List[str]):
+    """scrub subcommand: verify the organized library against stored digests"""
+    from library_scrub import LibraryScrubber
+
+    parser = argparse.ArgumentParser(
+        prog='family_photo_organizer.py scrub',
+        description='Verify organized library files against the library index'
+    )
+    parser.add_argument('library', help='Organized library directory (target of earlier runs)')
+    parser.add_argument('--rate-limit', type=float, help='Maximum read rate in MB/s')
+    parser.add_argument('--older-than', type=float, help='Only verify files not verified in the last N days')
+    parser.add_argument('--time-limit', type=float, help='Stop after N minutes; the next run resumes')
+    parser.add_argument('--restart', action='store_true', help='Discard the saved cursor and start a new pass')
+    parser.add_argument('--adopt-unknown', action='store_true', help='Hash unknown files into the index')
+    parser.add_argument('--accept-damage', action='store_true',
+                        help='Re-adopt known mismatched files as they are now and forget missing ones')
+
+    args = parser.parse_args(argv)
+
+    scrubber = LibraryScrubber(args.library,
+                               rate_limit_mb=args.rate_limit,
+                               older_than_days=args.older_than,
+                               time_limit_min=args.time_limit)
+    summary = scrubber.run(restart=args.restart, adopt_unknown=args.adopt_unknown,
+                           accept_failed=args.accept_damage)
+
+    # Non-zero exit while any damage is known (useful from cron)
+    if summary['mismatched'] or summary['missing'] or summary['known_bad']:
+        sys.exit(1)
+
+
+def merge_main(argv: List[str]):
+    """merge subcommand: combine shard outputs into one library"""
+    from shard_merge import ShardMerger
+
+    parser = argparse.ArgumentParser(
+        prog='family_photo_organizer.py merge',
+        description='Merge shard staging directories into the organized library'
+    )
+    parser.add_argument('library', help='Organized library directory')
+    parser.add_argument('shards', nargs='*', help='Shard directories (default: all unmerged in <library>/shards)')
+    parser.add_argument('--dry-run', action='store_true', help='Report what would be merged without moving files')
+
+    args = parser.parse_args(argv)
+
+    merger = ShardMerger(args.library, dry_run=args.dry_run)
+    merger.run(args.shards)
+
+
+def dedupe_main(argv: List[str]):
+    """dedupe subcommand: find duplicates in a directory and optionally reclaim space"""
+    from library_scrub import SKIP_DIRS
+
+    parser = argparse.ArgumentParser(
+        prog='family_photo_organizer.py dedupe',
+        description='Find duplicate files (parallel hashing) and reclaim their space'
+    )
+    parser.add_argument('directory', help='Organized library or any directory')
+    parser.add_argument('--action', choices=RECLAIM_ACTIONS, default='report',
+                        help='report only, replace copies with hardlinks/reflinks, or move them to quarantine')
+    parser.add_argument('--quarantine', help='Quarantine directory (default: <directory>/quarantine)')
+    parser.add_argument('--workers', type=int, default=4, help='Parallel hashing threads (default: 4)')
+    parser.add_argument('--min-size', type=int, default=10240, help='Ignore files smaller than this (bytes)')
+
+    args = parser.parse_args(argv)
+    root = Path(args.directory)
+
+    # Inside an organized library: reuse its hash cache and keep its index in sync
+    library_index = None
+    cache_file = None
+    skip_dirs = set()
+    if (root / "logs").is_dir():
+        library_index = LibraryIndex(str(root))
+        cache_file = str(root / "logs" / "duplicate_cache.json")
+        skip_dirs = SKIP_DIRS
+    checker = DuplicateChecker(cache_file=cache_file)
+    quarantine_dir = Path(args.quarantine) if args.quarantine else root / "quarantine"
+
+    # Skip hidden caches, and the bookkeeping folders when root is a library
+    # (elsewhere a folder named e.g. "logs" or "previews" is ordinary content)
+    filepaths = []
+    for entry in sorted(os.scandir(root), key=lambda e: e.name):
+        if entry.name.startswith('.') or entry.name in skip_dirs or entry.path == str(quarantine_dir):
+            continue
+        if entry.is_dir(follow_symlinks=False):
+            filepaths.extend(e.path for e in walk_files(entry.path))
+        elif entry.is_file(follow_symlinks=False):
+            filepaths.append(entry.path)
+
+    def keep_rank(filepath: str) -> int:
+        """Keep indexed files over organized but unindexed ones, and those over strays"""
+        rel_path = os.path.relpath(filepath, root)
+        if library_index is not None and library_index.relative(filepath) in library_index:
+            return 0
+        return 1 if rel_path.split(os.sep, 1)[0] in CATEGORY_FOLDERS else 2
+
+    groups = {}
+    reclaimed = 0
+    for file_hash, files in checker.iter_duplicates(filepaths, args.min_size, args.workers):
+        groups[file_hash] = files
+        keeper = checker.choose_keeper(files, keep_rank)
+        print(f"\nHash: {file_hash}")
+        for filepath in files:
+            print(f"  {'*' if filepath == keeper else '-'} {filepath}")
+
+        if args.action != 'report':
+            group_reclaimed, handled = checker.reclaim(files, args.action, str(quarantine_dir),
+                                                       str(root), keeper=keeper)
+            reclaimed += group_reclaimed
+            for filepath in handled:
+                print(f"  {args.action}: {filepath}")
+                if library_index is not None and args.action == 'quarantine':
+                    library_index.remove(library_index.relative(filepath))
+
+    checker.save_cache()
+    if library_index is not None:
+        library_index.save()
+
+    stats = checker.get_duplicate_stats(groups)
+    print(f"""
+        ========================================
+        DEDUPE REPORT ({args.action})
+        ========================================
+        Files scanned: {len(filepaths)}
+        Duplicate groups: {stats['total_duplicate_groups']}
+        Duplicate files: {stats['total_duplicate_files']}
+        Space saveable: {stats.get('space_saveable_human', '0.00 B')}
+        Space reclaimed: {reclaimed / (1024 * 1024):.2f} MB
+        ========================================""")
+
+
+def previews_main(argv: List[str]):
+    """previews subcommand: generate/evict the library's preview cache"""
+    from preview_cache import PreviewCache, PREVIEW_FORMATS
+
+    parser = argparse.ArgumentParser(
+        prog='family_photo_organizer.py previews',
+        description='Generate fixed-size previews of library images (incremental, content-hash keyed)'
+    )
+    parser.add_argument('library', help='Organized library directory')
+    parser.add_argument('--size', type=int, default=512, help='Longest preview edge in pixels (default: 512)')
+    parser.add_argument('--format', choices=PREVIEW_FORMATS, default='webp', help='Preview format (default: webp)')
+    parser.add_argument('--quality', type=int, default=80, help='Encoder quality (default: 80)')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: CPU count)')
+    parser.add_argument('--no-evict', action='store_true', help='Keep previews of files no longer in the library')
+
+    args = parser.parse_args(argv)
+
+    cache = PreviewCache(args.library, size=args.size, fmt=args.format,
+                         quality=args.quality, workers=args.workers)
+    summary = cache.run(evict=not args.no_evict)
+    if summary['failed']:
+        sys.exit(1)
+
+
+# Subcommands; anything else is the classic "source target" import
+COMMANDS = {
+    'scrub': scrub_main,
+    'merge': merge_main,
+    'dedupe': dedupe_main,
+    'previews': previews_main,
+}
+
+
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        COMMANDS[sys.argv[1]](sys.argv[2:])
+        return
+
     parser = argparse.ArgumentParser(
-        description='Organize photos/videos from Samsung SmartSwitch backup'
+        description='Organize photos/videos from Samsung SmartSwitch backup',
+        epilog='Other commands: ' + ', '.join(COMMANDS) + ' (use "<command> --help")'
     )
     parser.add_argument('source', help='SmartSwitch backup directory (e.g., SM-S921N_xxx)')
     parser.add_argument('target', help='Target directory for organized files')
     parser.add_argument('--dry-run', action='store_true', help='Run without actually moving files')
     parser.add_argument('--limit', type=int, help='Limit number of files to process (for testing)')
     parser.add_argument('--analyze-only', action='store_true', help='Only analyze structure, don\'t process')
+    parser.add_argument('--gazetteer', help='GeoNames-style gazetteer file for offline GPS place tags')
+    parser.add_argument('--shard', help='Process only shard K of N (e.g. 2/4); merge outputs with the merge command')
+    parser.add_argument('--shard-by', choices=SHARD_MODES, default='hash',
+                        help='Split by path hash or by backup folder (default: hash)')
+    parser.add_argument('--low-memory', action='store_true',
+                        help='Bounded-memory streaming mode for very large backups')
+    parser.add_argument('--cache-entries', type=int, default=10000,
+                        help='Hashes kept in memory in --low-memory mode (default: 10000)')
+    parser.add_argument('--metrics-file',
+                        help='Prometheus textfile to rewrite with live metrics (e.g. node_exporter textfile dir)')
+    parser.add_argument('--metrics-port', type=int,
+                        help='Serve live metrics on http://127.0.0.1:PORT/metrics')
+    parser.add_argument('--metrics-interval', type=float, default=15,
+                        help='Seconds between --metrics-file rewrites (default: 15)')
+    parser.add_argument('--bursts', action='store_true',
+                        help='Group burst/motion-photo sequences and process each as one unit')
+    parser.add_argument('--burst-tag', action='store_true',
+                        help='With --bursts: tag every member except the representative with __burst')
+    parser.add_argument('--burst-perceptual', action='store_true',
+                        help='With --bursts: also require similar perceptual hashes (slower)')
+    parser.add_argument('--durability', choices=DURABILITY_POLICIES, default='batch',
+                        help='fsync copies: none, batch (group commit, default) or each')
+    parser.add_argument('--sync-files', type=int, default=100,
+                        help='With --durability batch: sync after this many files (default: 100)')
+    parser.add_argument('--sync-mb', type=float, default=256,
+                        help='With --durability batch: ... or this many MB (default: 256)')
+    parser.add_argument('--verify', action='store_true',
+                        help='Re-read each synced copy from disk and compare with the source hash')
+    parser.add_argument('--previews', action='store_true',
+                        help='Update the preview cache after the import (same as the previews command)')
 
     args = parser.parse_args()
 
+    shard = None
+    if args.shard:
+        try:
+            shard = parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+
     # Initialize organizer
-    organizer = FamilyPhotoOrganizer(args.source, args.target, args.dry_run)
+    organizer = FamilyPhotoOrganizer(args.source, args.target, args.dry_run,
+                                     gazetteer=args.gazetteer,
+                                     shard=shard, shard_by=args.shard_by,
+                                     low_memory=args.low_memory,
+                                     cache_entries=args.cache_entries,
+                                     bursts=args.bursts,
+                                     burst_tag=args.burst_tag,
+                                     burst_perceptual=args.burst_perceptual,
+                                     metrics_file=args.metrics_file,
+                                     metrics_port=args.metrics_port,
+                                     metrics_interval=args.metrics_interval,
+                                     durability=args.durability,
+                                     sync_files=args.sync_files,
+                                     sync_mb=args.sync_mb,
+                                     verify=args.verify)
 
     if args.analyze_only:
         # Just analyze structure
@@ -439,6 +1206,11 @@ def main():
         # Process files
         organizer.process_all(limit=args.limit)
 
+        # Previews of a shard are built after the merge
+        if args.previews and not args.dry_run and not shard:
+            from preview_cache import PreviewCache
+            PreviewCache(args.target).run()
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
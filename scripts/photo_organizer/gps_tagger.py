@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+GPS Tagger Module
+Offline place tagging for geotagged photos using a local gazetteer
+Gazetteer: GeoNames-style dump (e.g. cities500.txt), no network access needed
+"""
+
+import os
+import re
+import csv
+import math
+import pickle
+from typing import Dict, List, Optional, Tuple
+from collections import defaultdict
+
+
+# GeoNames dump column positions (tab separated, no header)
+GEONAMES_NAME = 1
+GEONAMES_ASCIINAME = 2
+GEONAMES_LATITUDE = 4
+GEONAMES_LONGITUDE = 5
+GEONAMES_COUNTRY = 8
+
+INDEX_VERSION = 1
+EARTH_RADIUS_KM = 6371.0088
+
+
+def gps_to_decimal(value, ref=None) -> Optional[float]:
+    """
+    Convert an EXIF GPS coordinate to decimal degrees
+    value: exifread tag (with .values ratios) or its string form "[37, 33, 297/5]"
+    ref: 'N'/'S'/'E'/'W' reference tag or string
+    """
+    parts = getattr(value, 'values', None)
+    if parts is None:
+        parts = [p.strip() for p in str(value).strip('[]').split(',') if p.strip()]
+
+    try:
+        numbers = []
+        for part in parts:
+            if isinstance(part, str) and '/' in part:
+                num, den = part.split('/', 1)
+                numbers.append(float(num) / float(den) if float(den) else 0.0)
+            else:
+                numbers.append(float(part))
+    except (ValueError, ZeroDivisionError, TypeError):
+        return None
+
+    if not numbers:
+        return None
+
+    # Degrees, minutes, seconds (missing parts count as zero)
+    numbers += [0.0] * (3 - len(numbers))
+    decimal = numbers[0] + numbers[1] / 60.0 + numbers[2] / 3600.0
+
+    if ref is not None and str(ref).strip().upper() in ('S', 'W'):
+        decimal = -decimal
+
+    return decimal
+
+
+def place_tag(name: str) -> str:
+    """
+    Convert a place name to a Denote keyword (lowercase ascii alphanumerics only)
+    """
+    return re.sub(r'[^a-z0-9]', '', name.lower())
+
+
+class GazetteerIndex:
+    """Grid-bucketed spatial index over gazetteer places"""
+
+    def __init__(self, cell_deg: float = 0.1):
+        """
+        cell_deg: Grid cell size in degrees (0.1 deg ~ 11km of latitude)
+        """
+        self.cell_deg = cell_deg
+        self.names = []
+        self.coords = []
+        self.cells = defaultdict(list)
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return int(math.floor(lat / self.cell_deg)), int(math.floor(lon / self.cell_deg))
+
+    def add(self, name: str, lat: float, lon: float):
+        """Add a place to the index"""
+        idx = len(self.names)
+        self.names.append(name)
+        self.coords.append((lat, lon))
+        self.cells[self._cell(lat, lon)].append(idx)
+
+    @classmethod
+    def from_gazetteer(cls, gazetteer_file: str, cell_deg: float = 0.1) -> 'GazetteerIndex':
+        """
+        Build index from a GeoNames dump (tab separated) or a CSV with
+        name/latitude/longitude header columns
+        """
+        index = cls(cell_deg=cell_deg)
+
+        with open(gazetteer_file, 'r', encoding='utf-8', newline='') as f:
+            first_line = f.readline()
+            f.seek(0)
+
+            if '\t' in first_line:
+                # GeoNames dump: no header, fixed column layout
+                reader = csv.reader(f, delimiter='\t', quoting=csv.QUOTE_NONE)
+                for row in reader:
+                    if len(row) <= GEONAMES_COUNTRY:
+                        continue
+                    name = row[GEONAMES_ASCIINAME] or row[GEONAMES_NAME]
+                    try:
+                        index.add(name, float(row[GEONAMES_LATITUDE]), float(row[GEONAMES_LONGITUDE]))
+                    except ValueError:
+                        continue
+            else:
+                # Plain CSV with a header row
+                reader = csv.DictReader(f)
+                for row in reader:
+                    row = {k.strip().lower(): v for k, v in row.items() if k}
+                    name = row.get('asciiname') or row.get('name')
+                    lat = row.get('latitude') or row.get('lat')
+                    lon = row.get('longitude') or row.get('lon')
+                    if not name or lat is None or lon is None:
+                        continue
+                    try:
+                        index.add(name, float(lat), float(lon))
+                    except ValueError:
+                        continue
+
+        index.cells = dict(index.cells)
+        return index
+
+    def save(self, index_file: str, source_stat: Tuple[int, float]):
+        """Serialize index to disk together with the gazetteer size/mtime it was built from"""
+        tmp_file = f"{index_file}.tmp"
+        with open(tmp_file, 'wb') as f:
+            pickle.dump({
+                'version': INDEX_VERSION,
+                'source': source_stat,
+                'cell_deg': self.cell_deg,
+                'names': self.names,
+                'coords': self.coords,
+                'cells': dict(self.cells),
+            }, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, index_file)
+
+    @classmethod
+    def load(cls, index_file: str, source_stat: Tuple[int, float]) -> Optional['GazetteerIndex']:
+        """Load a serialized index, returns None if missing or stale"""
+        try:
+            with open(index_file, 'rb') as f:
+                data = pickle.load(f)
+        except (OSError, pickle.PickleError, EOFError):
+            return None
+
+        if data.get('version') != INDEX_VERSION or tuple(data.get('source', ())) != tuple(source_stat):
+            return None
+
+        index = cls(cell_deg=data['cell_deg'])
+        index.names = data['names']
+        index.coords = data['coords']
+        index.cells = data['cells']
+        return index
+
+    def _ring(self, cell: Tuple[int, int], ring: int) -> List[int]:
+        """Place indices in the cells exactly `ring` steps away from cell"""
+        row, col = cell
+        if ring == 0:
+            return list(self.cells.get(cell, ()))
+
+        candidates = []
+        for d_row in range(-ring, ring + 1):
+            step = 1 if abs(d_row) == ring else 2 * ring
+            for d_col in range(-ring, ring + 1, step):
+                candidates.extend(self.cells.get((row + d_row, col + d_col), ()))
+        return candidates
+
+    def nearest_batch(self, points: List[Tuple[float, float]],
+                      max_km: float = 25.0) -> List[Optional[str]]:
+        """
+        Find the nearest place name for each (lat, lon) point
+        Points are grouped by grid cell so each cell's neighbour rings are
+        gathered once per batch; rings are searched outward until no closer
+        place is possible. Returns None for points farther than max_km
+        """
+        results = [None] * len(points)
+        km_per_deg = math.pi * EARTH_RADIUS_KM / 180.0
+
+        by_cell = defaultdict(list)
+        for i, (lat, lon) in enumerate(points):
+            by_cell[self._cell(lat, lon)].append(i)
+
+        for cell, point_ids in by_cell.items():
+            # Smallest cell width in km around this cell (longitude shrinks with latitude)
+            edge_lat = max(abs(cell[0]), abs(cell[0] + 1)) * self.cell_deg
+            max_lat = min(89.9, edge_lat + max_km / km_per_deg)
+            cell_km = self.cell_deg * km_per_deg * math.cos(math.radians(max_lat))
+            max_rings = int(math.ceil(max_km / cell_km)) if cell_km > 0 else 1
+            rings = []
+
+            for i in point_ids:
+                lat1, lon1 = points[i]
+                lon_scale = math.cos(math.radians(lat1))
+
+                best = None
+                best_d2 = None
+                for ring in range(max_rings + 1):
+                    if ring == len(rings):
+                        rings.append(self._ring(cell, ring))
+                    for c in rings[ring]:
+                        lat2, lon2 = self.coords[c]
+                        # Planar distance in degrees; accurate enough to rank nearby places
+                        dy = lat2 - lat1
+                        dx = (lon2 - lon1) * lon_scale
+                        d2 = dx * dx + dy * dy
+                        if best_d2 is None or d2 < best_d2:
+                            best_d2 = d2
+                            best = c
+
+                    # Anything in the next ring is at least `ring` cells away
+                    if best_d2 is not None and math.sqrt(best_d2) * km_per_deg <= ring * cell_km:
+                        break
+
+                if best is not None:
+                    if self._haversine_km(lat1, lon1, *self.coords[best]) <= max_km:
+                        results[i] = self.names[best]
+
+        return results
+
+    @staticmethod
+    def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+        """Great-circle distance in km"""
+        lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+        h = (math.sin((lat2 - lat1) / 2) ** 2 +
+             math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+        return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(1.0, h)))
+
+
+class GpsTagger:
+    """Resolve photo GPS coordinates to Denote place tags"""
+
+    def __init__(self, gazetteer_file: str, index_file: str = None, max_km: float = 25.0):
+        """
+        Initialize tagger, loading the serialized index or building it once
+
+        Args:
+            gazetteer_file: GeoNames-style gazetteer file
+            index_file: Serialized index path (default: <gazetteer>.idx)
+            max_km: Maximum distance to the nearest place for a tag
+        """
+        self.gazetteer_file = gazetteer_file
+        self.index_file = index_file or f"{gazetteer_file}.idx"
+        self.max_km = max_km
+
+        st = os.stat(gazetteer_file)
+        source_stat = (st.st_size, st.st_mtime)
+
+        self.index = GazetteerIndex.load(self.index_file, source_stat)
+        if self.index is None:
+            self.index = GazetteerIndex.from_gazetteer(gazetteer_file)
+            try:
+                self.index.save(self.index_file, source_stat)
+            except OSError as e:
+                print(f"Warning: Could not save gazetteer index: {e}")
+
+    def tag_batch(self, gps_list: List[Optional[Dict]]) -> List[Optional[str]]:
+        """
+        Resolve a batch of metadata GPS dicts ({'lat': float, 'lon': float} or None)
+        Returns a place tag (or None) for each entry
+        """
+        positions = []
+        points = []
+        for i, gps in enumerate(gps_list):
+            if gps and gps.get('lat') is not None and gps.get('lon') is not None:
+                # (0, 0) is what many phones write when there is no fix
+                if gps['lat'] == 0 and gps['lon'] == 0:
+                    continue
+                positions.append(i)
+                points.append((gps['lat'], gps['lon']))
+
+        tags = [None] * len(gps_list)
+        if not points:
+            return tags
+
+        for i, name in zip(positions, self.index.nearest_batch(points, self.max_km)):
+            if name:
+                tags[i] = place_tag(name) or None
+
+        return tags
+
+
+# Testing function
+if __name__ == "__main__":
+    import sys
+    import time
+    import random
+
+    if len(sys.argv) < 2:
+        print("Usage: gps_tagger.py <gazetteer-file> [lat lon]")
+        sys.exit(1)
+
+    start = time.time()
+    tagger = GpsTagger(sys.argv[1])
+    print(f"Index ready: {len(tagger.index.names)} places in {time.time() - start:.2f}s")
+
+    if len(sys.argv) >= 4:
+        print(tagger.tag_batch([{'lat': float(sys.argv[2]), 'lon': float(sys.argv[3])}]))
+    else:
+        # Benchmark with random points around the Korean peninsula
+        points = [{'lat': random.uniform(33.0, 38.5), 'lon': random.uniform(125.0, 130.0)}
+                  for _ in range(50000)]
+        start = time.time()
+        tags = tagger.tag_batch(points)
+        print(f"Tagged {sum(1 for t in tags if t)}/{len(points)} points in {time.time() - start:.2f}s")
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Library Index Module
+Persistent record of every file written into the organized library:
+relative path -> MD5 digest, size, mtime and last verification time (or the
+status of a failed one)
+Additions can also be appended to a journal (JSON lines) without loading
+the index, which keeps memory flat during very large imports, or on top of
+the loaded index so completed copies survive a crash before the final save
+"""
+
+import os
+import json
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+INDEX_VERSION = 1
+
+
+class LibraryIndex:
+    """Digest index for the organized family library"""
+
+    def __init__(self, library_dir: str, index_file: str = None, append_only: bool = False,
+                 durable: bool = False):
+        """
+        Args:
+            library_dir: Organized library root (target directory)
+            index_file: Index path (default: <library>/logs/library_index.json)
+            append_only: Don't load the index; add() only appends to the journal
+            durable: Also journal every add(); sync() makes the journal durable
+                     and save() fsyncs the index before replacing it
+        """
+        self.library_dir = library_dir
+        self.index_file = index_file or os.path.join(library_dir, "logs", "library_index.json")
+        self.journal_file = os.path.splitext(self.index_file)[0] + ".journal"
+        self.append_only = append_only
+        self.durable = durable
+        self.journal = None
+        self.files = {}
+        self.dirty = False
+
+        if not append_only and (os.path.exists(self.index_file) or os.path.exists(self.journal_file)):
+            self.load()
+
+    def load(self):
+        """Load index from file, then replay journaled additions"""
+        try:
+            if os.path.exists(self.index_file):
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self.files = data.get('files', {})
+        except Exception as e:
+            print(f"Warning: Could not load library index: {e}")
+            self.files = {}
+
+        if os.path.exists(self.journal_file):
+            with open(self.journal_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Torn last line after a crash
+                        continue
+                    self.files[record.pop('path')] = record
+            self.dirty = True
+
+    def save(self):
+        """Save index atomically (write temp file, then rename)"""
+        if self.append_only:
+            if self.journal:
+                self.journal.flush()
+            return
+        if not self.dirty:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.index_file), exist_ok=True)
+            tmp_file = f"{self.index_file}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({'version': INDEX_VERSION, 'files': self.files}, f,
+                          ensure_ascii=False, indent=1)
+                if self.durable:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(tmp_file, self.index_file)
+            # Everything journaled is in the index now
+            if self.journal:
+                self.journal.close()
+                self.journal = None
+            if os.path.exists(self.journal_file):
+                os.remove(self.journal_file)
+            self.dirty = False
+        except Exception as e:
+            print(f"Warning: Could not save library index: {e}")
+
+    def relative(self, filepath: str) -> str:
+        """Library-relative key (always '/' separated)"""
+        return os.path.relpath(filepath, self.library_dir).replace(os.sep, '/')
+
+    def add(self, filepath: str, md5: str, size: int, mtime: float = None):
+        """Record a file written into the library (verified now)"""
+        now = time.time()
+        entry = {
+            'md5': md5,
+            'size': size,
+            'mtime': mtime if mtime is not None else os.path.getmtime(filepath),
+            'added': now,
+            'verified': now,
+        }
+
+        if self.append_only or self.durable:
+            if self.journal is None:
+                os.makedirs(os.path.dirname(self.journal_file), exist_ok=True)
+                self.journal = open(self.journal_file, 'a', encoding='utf-8')
+            self.journal.write(json.dumps(dict(entry, path=self.relative(filepath)),
+                                          ensure_ascii=False) + "\n")
+            if self.append_only:
+                return
+
+        self.files[self.relative(filepath)] = entry
+        self.dirty = True
+
+    def sync(self):
+        """Make journaled additions durable (flush + fsync the journal)"""
+        if self.journal:
+            self.journal.flush()
+            os.fsync(self.journal.fileno())
+
+    def get(self, rel_path: str) -> Optional[Dict]:
+        """Entry for a library-relative path"""
+        return self.files.get(rel_path)
+
+    def remove(self, rel_path: str):
+        """Forget a library-relative path"""
+        if self.files.pop(rel_path, None) is not None:
+            self.dirty = True
+
+    def mark_verified(self, rel_path: str, when: float = None):
+        """Update the last successful verification time (clears a recorded failure)"""
+        entry = self.files.get(rel_path)
+        if entry is not None:
+            entry['verified'] = when if when is not None else time.time()
+            entry.pop('status', None)
+            entry.pop('problem', None)
+            self.dirty = True
+
+    def mark_failed(self, rel_path: str, status: str, problem: str = None):
+        """Record a failed verification ('mismatch' or 'missing') until resolved"""
+        entry = self.files.get(rel_path)
+        if entry is not None:
+            entry['status'] = status
+            if problem:
+                entry['problem'] = problem
+            self.dirty = True
+
+    def failed(self) -> List[Tuple[str, Dict]]:
+        """Sorted (path, entry) of files whose last verification failed"""
+        return sorted((rel_path, entry) for rel_path, entry in self.files.items()
+                      if entry.get('status'))
+
+    def keys(self) -> List[str]:
+        """Sorted library-relative paths (stable order for resumable walks)"""
+        return sorted(self.files)
+
+    def items(self) -> Iterator[Tuple[str, Dict]]:
+        return iter(self.files.items())
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def __contains__(self, rel_path: str) -> bool:
+        return rel_path in self.files
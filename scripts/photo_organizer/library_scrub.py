@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Library Scrub Module
+Re-hash the organized library against the stored digests to detect bit rot,
+truncation, missing and unknown files. Throttled and resumable so a full
+pass over a large external drive can be spread over several nights
+"""
+
+import os
+import json
+import time
+import hashlib
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from library_index import LibraryIndex
+
+
+# Library folders that are not part of the archive itself
+SKIP_DIRS = {'logs', 'shards', 'quarantine', 'previews'}
+
+
+class LibraryScrubber:
+    """Verify library files against the library index"""
+
+    def __init__(self, library_dir: str, rate_limit_mb: float = None,
+                 older_than_days: float = None, time_limit_min: float = None,
+                 chunk_size: int = 4 * 1024 * 1024):
+        """
+        Args:
+            library_dir: Organized library root
+            rate_limit_mb: Maximum read throughput in MB/s (None = unlimited)
+            older_than_days: Only verify files not verified in the last N days
+            time_limit_min: Stop (and save the cursor) after this many minutes
+            chunk_size: Sequential read size in bytes
+        """
+        self.library_dir = library_dir
+        self.rate_limit = rate_limit_mb * 1024 * 1024 if rate_limit_mb else None
+        self.older_than = older_than_days * 86400 if older_than_days else None
+        self.time_limit = time_limit_min * 60 if time_limit_min else None
+        self.chunk_size = chunk_size
+
+        self.index = LibraryIndex(library_dir)
+        self.state_file = os.path.join(library_dir, "logs", "scrub_state.json")
+        self.state = self.load_state()
+
+        # Throttle bookkeeping for this run
+        self.run_start = None
+        self.run_bytes = 0
+
+    def new_state(self) -> Dict:
+        return {
+            'cursor': None,
+            'pass_started': datetime.now().isoformat(timespec='seconds'),
+            'verified': 0,
+            'skipped': 0,
+            'bytes': 0,
+            'mismatched': [],
+            'missing': [],
+        }
+
+    def load_state(self) -> Dict:
+        """Load the resumable scrub state (cursor and partial pass results)"""
+        if os.path.exists(self.state_file):
+            try:
+                with open(self.state_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"Warning: Could not load scrub state: {e}")
+        return self.new_state()
+
+    def save_state(self):
+        """Save scrub state atomically"""
+        os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+        tmp_file = f"{self.state_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, self.state_file)
+
+    def throttle(self, nbytes: int):
+        """Sleep as needed to keep this run's read rate under the limit"""
+        self.run_bytes += nbytes
+        if not self.rate_limit:
+            return
+        expected = self.run_bytes / self.rate_limit
+        elapsed = time.monotonic() - self.run_start
+        if expected > elapsed:
+            time.sleep(expected - elapsed)
+
+    def hash_file(self, filepath: str) -> str:
+        """MD5 of a file using large sequential reads"""
+        hasher = hashlib.md5()
+        with open(filepath, 'rb', buffering=0) as f:
+            while True:
+                chunk = f.read(self.chunk_size)
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                self.throttle(len(chunk))
+        return hasher.hexdigest()
+
+    def verify(self, rel_path: str, entry: Dict) -> Optional[str]:
+        """
+        Verify one indexed file
+        Returns None if ok, 'missing', or a mismatch description
+        """
+        filepath = os.path.join(self.library_dir, rel_path)
+        try:
+            size = os.path.getsize(filepath)
+        except FileNotFoundError:
+            return 'missing'
+
+        if size != entry['size']:
+            # Truncated or rewritten; no need to read it
+            return f"size {size} != {entry['size']}"
+
+        digest = self.hash_file(filepath)
+        if digest != entry['md5']:
+            return f"md5 {digest} != {entry['md5']}"
+
+        return None
+
+    def find_unknown(self) -> List[str]:
+        """Library files that have no index entry"""
+        unknown = []
+        for root, dirs, files in os.walk(self.library_dir):
+            if root == self.library_dir:
+                dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+            dirs[:] = [d for d in dirs if not d.startswith('.')]
+            for filename in files:
+                rel_path = self.index.relative(os.path.join(root, filename))
+                if rel_path not in self.index:
+                    unknown.append(rel_path)
+        return sorted(unknown)
+
+    def adopt(self, rel_paths: List[str]):
+        """Hash unknown files and add them to the index"""
+        for rel_path in rel_paths:
+            filepath = os.path.join(self.library_dir, rel_path)
+            st = os.stat(filepath)
+            self.index.add(filepath, self.hash_file(filepath), st.st_size, st.st_mtime)
+
+    def accept_failed(self) -> int:
+        """Accept known damage: re-adopt mismatched files as they are now, forget missing ones"""
+        accepted = 0
+        for rel_path, entry in self.index.failed():
+            if entry['status'] == 'missing':
+                self.index.remove(rel_path)
+            else:
+                # A fresh entry, without the failure status
+                self.adopt([rel_path])
+            accepted += 1
+        return accepted
+
+    def run(self, restart: bool = False, adopt_unknown: bool = False,
+            accept_failed: bool = False) -> Dict:
+        """
+        Scrub from the saved cursor until the pass completes or the time limit hits
+        Returns a summary dict; 'complete' tells whether the pass finished and
+        'known_bad' lists failures recorded in earlier passes that still stand
+        """
+        if restart:
+            self.state = self.new_state()
+
+        accepted = self.accept_failed() if accept_failed else 0
+
+        self.run_start = time.monotonic()
+        self.run_bytes = 0
+        now = time.time()
+        cursor = self.state['cursor']
+        complete = True
+        examined = 0
+
+        for rel_path in self.index.keys():
+            if cursor is not None and rel_path <= cursor:
+                continue
+
+            if self.time_limit and time.monotonic() - self.run_start >= self.time_limit:
+                complete = False
+                break
+
+            entry = self.index.get(rel_path)
+            # Known-bad files are always re-checked: 'verified' still holds
+            # the last good check, and they may have been restored since
+            if (self.older_than and not entry.get('status')
+                    and now - entry.get('verified', 0) < self.older_than):
+                self.state['skipped'] += 1
+            else:
+                problem = self.verify(rel_path, entry)
+                if problem is None:
+                    self.index.mark_verified(rel_path)
+                    self.state['verified'] += 1
+                    self.state['bytes'] += entry['size']
+                elif problem == 'missing':
+                    self.index.mark_failed(rel_path, 'missing')
+                    self.state['missing'].append(rel_path)
+                else:
+                    self.index.mark_failed(rel_path, 'mismatch', problem)
+                    self.state['mismatched'].append([rel_path, problem])
+
+            self.state['cursor'] = rel_path
+            examined += 1
+
+            # Checkpoint periodically so an interrupted night loses little work
+            if examined % 500 == 0:
+                self.index.save()
+                self.save_state()
+
+        summary = dict(self.state)
+        summary['complete'] = complete
+        if accepted:
+            summary['accepted'] = accepted
+        # Failures from earlier passes (or not reached yet in this one)
+        reported = set(self.state['missing']) | {rel_path for rel_path, _ in self.state['mismatched']}
+        summary['known_bad'] = [[rel_path, entry['status'], entry.get('problem')]
+                                for rel_path, entry in self.index.failed()
+                                if rel_path not in reported]
+        summary['run_bytes'] = self.run_bytes
+        summary['run_seconds'] = time.monotonic() - self.run_start
+
+        if complete:
+            unknown = self.find_unknown()
+            if adopt_unknown and unknown:
+                self.adopt(unknown)
+                summary['adopted'] = len(unknown)
+                unknown = []
+            summary['unknown'] = unknown
+            # Next run starts a fresh pass
+            self.state = self.new_state()
+
+        self.index.save()
+        self.save_state()
+        self.write_report(summary)
+        return summary
+
+    def write_report(self, summary: Dict):
+        """Print and save a scrub report"""
+        mb = summary['run_bytes'] / (1024 * 1024)
+        seconds = max(summary['run_seconds'], 1e-6)
+        report = f"""
+        ========================================
+        SCRUB REPORT ({'pass complete' if summary['complete'] else 'paused, will resume'})
+        ========================================
+        Pass started: {summary['pass_started']}
+        Indexed files: {len(self.index)}
+        Verified OK: {summary['verified']}
+        Skipped (recently verified): {summary['skipped']}
+        Mismatched: {len(summary['mismatched'])}
+        Missing: {len(summary['missing'])}
+        This run: {mb:.1f} MB in {seconds:.0f}s ({mb / seconds:.1f} MB/s)
+        """
+
+        for rel_path, problem in summary['mismatched']:
+            report += f"\n        MISMATCH {rel_path}: {problem}"
+        for rel_path in summary['missing']:
+            report += f"\n        MISSING  {rel_path}"
+
+        if summary['known_bad']:
+            report += f"\n\n        Known damage (earlier passes, unresolved): {len(summary['known_bad'])}"
+            for rel_path, status, problem in summary['known_bad']:
+                label = 'MISMATCH' if status == 'mismatch' else 'MISSING '
+                report += f"\n        {label} {rel_path}" + (f": {problem}" if problem else "")
+        if summary.get('accepted'):
+            report += f"\n        Accepted into index: {summary['accepted']}"
+
+        if summary['complete']:
+            report += f"\n\n        Unknown (not in index): {len(summary['unknown'])}"
+            for rel_path in summary['unknown']:
+                report += f"\n        UNKNOWN  {rel_path}"
+            if summary.get('adopted'):
+                report += f"\n        Adopted into index: {summary['adopted']}"
+        else:
+            report += f"\n\n        Cursor: {summary['cursor']}"
+
+        report += "\n        ========================================"
+        print(report)
+
+        report_file = os.path.join(self.library_dir, "logs",
+                                   f"scrub_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt")
+        with open(report_file, 'w', encoding='utf-8') as f:
+            f.write(report)
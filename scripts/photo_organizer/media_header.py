@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Media Header Module
+Read image pixel dimensions from file headers without decoding
+and classify thumbnails/cached previews by dimensions and path hints
+"""
+
+import os
+import struct
+from pathlib import Path
+from typing import Optional, Tuple
+
+
+# JPEG start-of-frame markers (excluding DHT 0xC4, JPG 0xC8, DAC 0xCC)
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7,
+                    0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+# ISO BMFF container boxes walked to reach 'ispe' in HEIC/HEIF/AVIF
+BMFF_CONTAINERS = {b'meta': 4, b'iprp': 0, b'ipco': 0}
+BMFF_MAX_META = 1024 * 1024
+
+
+def _jpeg_size(f) -> Optional[Tuple[int, int]]:
+    """Walk JPEG segments until a SOF marker, seeking over everything else"""
+    f.seek(2)
+    while True:
+        byte = f.read(1)
+        while byte and byte != b'\xff':
+            byte = f.read(1)
+        while byte == b'\xff':
+            byte = f.read(1)
+        if not byte:
+            return None
+
+        marker = byte[0]
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            # Standalone markers without a length
+            continue
+        if marker in (0xD9, 0xDA):
+            # End of image / start of scan before any frame header
+            return None
+
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = struct.unpack('>H', length_bytes)[0]
+
+        if marker in JPEG_SOF_MARKERS:
+            data = f.read(5)
+            if len(data) < 5:
+                return None
+            height, width = struct.unpack('>HH', data[1:5])
+            return width, height
+
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+def _webp_size(header: bytes) -> Optional[Tuple[int, int]]:
+    """WebP VP8 / VP8L / VP8X chunk dimensions"""
+    chunk = header[12:16]
+    if chunk == b'VP8 ' and len(header) >= 30:
+        width, height = struct.unpack('<HH', header[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b'VP8L' and len(header) >= 25:
+        bits = struct.unpack('<I', header[21:25])[0]
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b'VP8X' and len(header) >= 30:
+        width = int.from_bytes(header[24:27], 'little') + 1
+        height = int.from_bytes(header[27:30], 'little') + 1
+        return width, height
+    return None
+
+
+def _bmff_size(f, end: int) -> Optional[Tuple[int, int]]:
+    """
+    Find the largest 'ispe' (image spatial extents) box in HEIC/HEIF/AVIF
+    The primary image is the largest; tiles and thumbnails are smaller
+    """
+    best = None
+    while f.tell() + 8 <= end:
+        start = f.tell()
+        header = f.read(8)
+        if len(header) < 8:
+            break
+        size, box_type = struct.unpack('>I4s', header)
+        header_len = 8
+        if size == 1:
+            size = struct.unpack('>Q', f.read(8))[0]
+            header_len = 16
+        elif size == 0:
+            size = end - start
+        if size < header_len:
+            break
+        box_end = min(start + size, end)
+
+        if box_type in BMFF_CONTAINERS:
+            if box_type == b'meta' and size > BMFF_MAX_META:
+                break
+            f.seek(BMFF_CONTAINERS[box_type], os.SEEK_CUR)
+            found = _bmff_size(f, box_end)
+            if found and (best is None or found[0] * found[1] > best[0] * best[1]):
+                best = found
+            if box_type == b'meta':
+                # Everything needed is inside 'meta'; skip the (large) media data
+                return best
+        elif box_type == b'ispe':
+            data = f.read(12)
+            if len(data) == 12:
+                found = struct.unpack('>II', data[4:12])
+                if best is None or found[0] * found[1] > best[0] * best[1]:
+                    best = found
+        elif box_type == b'mdat':
+            break
+
+        f.seek(box_end)
+    return best
+
+
+def read_image_size(filepath: str) -> Optional[Tuple[int, int]]:
+    """
+    Read (width, height) from the image header only
+    Supports JPEG, PNG, GIF, BMP, WebP and HEIC/HEIF/AVIF
+    Returns None for unknown formats or unreadable headers
+    """
+    try:
+        with open(filepath, 'rb') as f:
+            header = f.read(32)
+
+            if header[:2] == b'\xff\xd8':
+                return _jpeg_size(f)
+            if header[:8] == b'\x89PNG\r\n\x1a\n' and header[12:16] == b'IHDR':
+                return struct.unpack('>II', header[16:24])
+            if header[:6] in (b'GIF87a', b'GIF89a'):
+                return struct.unpack('<HH', header[6:10])
+            if header[:2] == b'BM' and len(header) >= 26:
+                width, height = struct.unpack('<ii', header[18:26])
+                return abs(width), abs(height)
+            if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+                return _webp_size(header)
+            if header[4:8] == b'ftyp':
+                f.seek(0)
+                return _bmff_size(f, os.fstat(f.fileno()).st_size)
+    except (OSError, struct.error):
+        return None
+
+    return None
+
+
+class ThumbnailClassifier:
+    """Decide which candidate media files are thumbnails or cached previews"""
+
+    # Path components that mark generated thumbnails / caches
+    PATH_HINTS = ('.thumbnails', 'thumbnails', 'thumbnail', 'thumbs', '.thumb',
+                  'cache', '.cache')
+
+    # Dimensions generators use for thumbnails (square gallery/app thumbnails,
+    # the 160x120 EXIF thumbnail); real photos almost never have them
+    KNOWN_THUMB_SIZES = {(96, 96), (128, 128), (150, 150), (160, 160), (200, 200),
+                         (256, 256), (160, 120), (120, 160)}
+
+    # Backup folders where small images are real content (old MMS pictures,
+    # downloaded GIFs): never excluded by dimensions alone
+    KEEP_SMALL_FOLDERS = ('MESSAGE', 'DOWNLOAD')
+
+    def __init__(self, max_thumb_edge: int = 256, max_preview_edge: int = 1280,
+                 min_unknown_size: int = 10 * 1024):
+        """
+        Args:
+            max_thumb_edge: Images up to this edge are thumbnails under a cache/thumbnail
+                            path, or anywhere (outside MESSAGE/DOWNLOAD) if they
+                            have a known thumbnail size
+            max_preview_edge: Images under a cache/thumbnail path up to this edge are previews
+            min_unknown_size: Files with no readable header below this size are skipped
+        """
+        self.max_thumb_edge = max_thumb_edge
+        self.max_preview_edge = max_preview_edge
+        self.min_unknown_size = min_unknown_size
+        self.image_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp',
+                                 '.heic', '.heif', '.avif'}
+
+    def path_hint(self, rel_path: Path) -> Optional[str]:
+        """Return the directory name that marks rel_path as a cache/thumbnail location"""
+        for part in rel_path.parts[:-1]:
+            lowered = part.lower()
+            if lowered in self.PATH_HINTS or lowered.startswith('.thumbnail'):
+                return part
+        return None
+
+    def classify(self, file_path: Path, rel_path: Path, size: int) -> Optional[Tuple[str, str]]:
+        """
+        Classify a candidate file
+        rel_path: Path relative to the backup root (only these parts are checked for hints)
+        Returns (reason, detail) if the file should be excluded, None to keep it
+        """
+        if size == 0:
+            return 'empty', '0 bytes'
+
+        hint = self.path_hint(rel_path)
+
+        if file_path.suffix.lower() not in self.image_extensions:
+            # Videos: no cheap header dimensions, only the location decides
+            return ('cache-path', hint) if hint else None
+
+        dims = read_image_size(str(file_path))
+        if dims is None:
+            if hint:
+                return 'cache-path', f"{hint}, unreadable header"
+            if size < self.min_unknown_size:
+                return 'unreadable', f"no image header, {size} bytes"
+            return None
+
+        edge = max(dims)
+        if hint and edge <= self.max_thumb_edge:
+            return 'thumbnail', f"{dims[0]}x{dims[1]} in {hint}"
+        if hint and edge <= self.max_preview_edge:
+            return 'cached-preview', f"{dims[0]}x{dims[1]} in {hint}"
+
+        # No cache location: only exact thumbnail sizes, and never where small
+        # images are expected (a 176x144 MMS photo or a 120x90 GIF is kept)
+        top_folder = rel_path.parts[0].upper() if len(rel_path.parts) > 1 else ''
+        if (edge <= self.max_thumb_edge and tuple(dims) in self.KNOWN_THUMB_SIZES
+                and top_folder not in self.KEEP_SMALL_FOLDERS):
+            return 'thumbnail', f"{dims[0]}x{dims[1]}"
+
+        return None
+
+
+# Testing function
+if __name__ == "__main__":
+    import sys
+
+    classifier = ThumbnailClassifier()
+    for arg in sys.argv[1:]:
+        path = Path(arg)
+        dims = read_image_size(arg)
+        result = classifier.classify(path, path, path.stat().st_size)
+        print(f"{arg}: {dims} -> {' / '.join(result) if result else 'keep'}")
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Metrics Module
+Counters, gauges and histograms for long-running imports, exported in the
+Prometheus text format as a periodically rewritten textfile (for the
+node_exporter textfile collector) and/or a tiny local HTTP endpoint
+"""
+
+import os
+import threading
+from typing import Callable, Dict, List, Tuple
+
+
+PREFIX = "photo_organizer"
+
+# Seconds; EXIF parsing is ~1 ms, a large video copy can take a minute
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def escape_label(value) -> str:
+    """Escape a label value (backslash, double quote, newline)"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_value(value) -> str:
+    """Exact sample value (no exponent rounding for timestamps and byte counts)"""
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+
+def format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{escape_label(value)}"' for key, value in labels) + '}'
+
+
+class Metrics:
+    """Thread-safe metric registry rendered in Prometheus text format"""
+
+    def __init__(self, prefix: str = PREFIX):
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        # name -> (type, help); values keyed by (name, sorted label pairs)
+        self.meta = {}
+        self.values = {}
+        # name -> (buckets, {labels: [bucket counts..., sum, count]})
+        self.histograms = {}
+        # Called before rendering to refresh gauges from other state
+        self.collectors: List[Callable[['Metrics'], None]] = []
+
+        self.textfile = None
+        self.server = None
+        self.stop_event = threading.Event()
+        self.writer = None
+
+    def declare(self, name: str, metric_type: str, help_text: str, buckets: Tuple = None):
+        """Register a metric name with its type (counter, gauge, histogram)"""
+        self.meta[name] = (metric_type, help_text)
+        if metric_type == 'histogram':
+            self.histograms[name] = (tuple(buckets or LATENCY_BUCKETS), {})
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Increase a counter"""
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        """Set a gauge"""
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.values[key] = value
+
+    def replace(self, name: str, value: float, **labels):
+        """Set a gauge, dropping its other label sets (e.g. the current file)"""
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            for other in [k for k in self.values if k[0] == name]:
+                del self.values[other]
+            self.values[key] = value
+
+    def clear(self, name: str):
+        """Drop every label set of a metric"""
+        with self.lock:
+            for key in [k for k in self.values if k[0] == name]:
+                del self.values[key]
+
+    def observe(self, name: str, value: float, **labels):
+        """Record one histogram observation"""
+        buckets, series = self.histograms[name]
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            counts = series.setdefault(key, [0] * (len(buckets) + 2))
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-2] += value
+            counts[-1] += 1
+
+    def render(self) -> str:
+        """Current values in Prometheus text exposition format"""
+        for collector in self.collectors:
+            collector(self)
+
+        lines = []
+        with self.lock:
+            by_name: Dict[str, list] = {}
+            for (name, labels), value in self.values.items():
+                by_name.setdefault(name, []).append((labels, value))
+
+            for name in sorted(set(by_name) | set(self.histograms)):
+                if name in self.histograms and not self.histograms[name][1]:
+                    continue
+                metric_type, help_text = self.meta.get(name, ('untyped', ''))
+                full_name = f"{self.prefix}_{name}"
+                lines.append(f"# HELP {full_name} {help_text}")
+                lines.append(f"# TYPE {full_name} {metric_type}")
+
+                if name in self.histograms:
+                    buckets, series = self.histograms[name]
+                    for labels, counts in sorted(series.items()):
+                        for bound, count in zip(buckets, counts):
+                            bucket_labels = labels + (('le', f"{bound:g}"),)
+                            lines.append(f"{full_name}_bucket{format_labels(bucket_labels)} {count}")
+                        inf_labels = labels + (('le', '+Inf'),)
+                        lines.append(f"{full_name}_bucket{format_labels(inf_labels)} {counts[-1]}")
+                        lines.append(f"{full_name}_sum{format_labels(labels)} {counts[-2]:.6f}")
+                        lines.append(f"{full_name}_count{format_labels(labels)} {counts[-1]}")
+                    continue
+
+                for labels, value in sorted(by_name[name]):
+                    lines.append(f"{full_name}{format_labels(labels)} {format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str = None):
+        """Rewrite the textfile atomically (the collector never sees a partial file)"""
+        path = path or self.textfile
+        if not path:
+            return
+        try:
+            tmp_file = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                f.write(self.render())
+            os.replace(tmp_file, path)
+        except Exception as e:
+            print(f"Warning: Could not write metrics file: {e}")
+
+    def start_textfile(self, path: str, interval: float = 15):
+        """Rewrite the textfile every interval seconds from a background thread"""
+        self.textfile = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.write_textfile()
+
+        def loop():
+            while not self.stop_event.wait(interval):
+                self.write_textfile()
+
+        self.writer = threading.Thread(target=loop, name="metrics-textfile", daemon=True)
+        self.writer.start()
+
+    def start_http(self, port: int, host: str = '127.0.0.1'):
+        """Serve /metrics on a local port from a background thread"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # Keep scrapes out of the organizer output
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True).start()
+        return self.server.server_address
+
+    def stop(self):
+        """Stop exporting; the textfile keeps the final values"""
+        self.stop_event.set()
+        if self.writer:
+            self.writer.join(timeout=5)
+        self.write_textfile()
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
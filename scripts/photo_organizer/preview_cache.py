@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Preview Cache Module
+Fixed-size WebP/JPEG previews of the organized library, keyed by content
+hash so renames and re-imports never regenerate them. JPEGs are decoded at
+reduced resolution (Image.draft), work is spread over a process pool, and
+previews of files that left the library are evicted
+"""
+
+import os
+import json
+import time
+from typing import Dict, List, Optional, Tuple
+
+from library_index import LibraryIndex
+from duplicate_checker import DuplicateChecker
+from library_scrub import SKIP_DIRS
+
+
+PREVIEW_FORMATS = {'webp': '.webp', 'jpeg': '.jpg'}
+
+# Formats Pillow decodes without plugins (HEIC needs pillow-heif)
+PREVIEW_SOURCE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp'}
+
+
+def render_preview(task: Tuple[str, str, int, str, int]) -> Tuple[str, Optional[str]]:
+    """
+    Write one preview (runs in a worker process)
+    task: (source, destination, longest edge, format, quality)
+    Returns (destination, error or None)
+    """
+    source, dest, size, fmt, quality = task
+    try:
+        from PIL import Image, ImageOps
+
+        with Image.open(source) as im:
+            # Let the JPEG decoder scale by 1/2..1/8 while decoding; the result
+            # is still at least size x size, so quality is unaffected
+            im.draft('RGB', (size, size))
+            im = ImageOps.exif_transpose(im)
+            im.thumbnail((size, size))
+            if im.mode not in ('RGB', 'RGBA') or fmt == 'jpeg':
+                im = im.convert('RGB')
+
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            tmp_file = f"{dest}.{os.getpid()}.tmp"
+            im.save(tmp_file, format=fmt.upper(), quality=quality)
+            os.replace(tmp_file, dest)
+        return dest, None
+    except Exception as e:
+        return dest, str(e)
+
+
+class PreviewCache:
+    """Incremental preview generation for an organized library"""
+
+    def __init__(self, library_dir: str, size: int = 512, fmt: str = 'webp',
+                 quality: int = 80, workers: int = None):
+        """
+        Args:
+            library_dir: Organized library root
+            size: Longest preview edge in pixels
+            fmt: 'webp' or 'jpeg'
+            quality: Encoder quality (1-100)
+            workers: Worker processes (default: CPU count)
+        """
+        self.library_dir = library_dir
+        self.size = size
+        self.fmt = fmt
+        self.quality = quality
+        self.workers = workers or os.cpu_count() or 1
+
+        # One cache per size/format: <library>/previews/512-webp/ab/<md5>.webp
+        self.cache_dir = os.path.join(library_dir, "previews", f"{size}-{fmt}")
+        self.manifest_file = os.path.join(self.cache_dir, "index.json")
+
+        self.index = LibraryIndex(library_dir)
+        self.checker = DuplicateChecker(
+            cache_file=os.path.join(library_dir, "logs", "duplicate_cache.json"))
+
+        self.stats = {
+            'images': 0,
+            'cached': 0,
+            'generated': 0,
+            'failed': 0,
+            'evicted': 0,
+            'hashed': 0,
+        }
+        self.errors = []
+
+    def preview_path(self, md5: str) -> str:
+        return os.path.join(self.cache_dir, md5[:2], md5 + PREVIEW_FORMATS[self.fmt])
+
+    def iter_images(self):
+        """(library-relative path, absolute path) of every previewable image"""
+        for root, dirs, files in os.walk(self.library_dir):
+            if root == self.library_dir:
+                dirs[:] = [d for d in dirs if d not in SKIP_DIRS and not d.startswith('.')]
+            dirs.sort()
+            for filename in sorted(files):
+                if os.path.splitext(filename)[1].lower() in PREVIEW_SOURCE_EXTENSIONS:
+                    filepath = os.path.join(root, filename)
+                    yield self.index.relative(filepath), filepath
+
+    def content_hash(self, rel_path: str, filepath: str) -> Optional[str]:
+        """Digest from the library index when size/mtime still match, else hashed"""
+        entry = self.index.get(rel_path)
+        try:
+            st = os.stat(filepath)
+        except OSError:
+            return None
+        if entry and entry['size'] == st.st_size and entry.get('mtime') == st.st_mtime:
+            return entry['md5']
+        self.stats['hashed'] += 1
+        return self.checker.calculate_hash(filepath)
+
+    def evict(self, keep: set):
+        """Remove previews whose content is no longer in the library"""
+        if not os.path.isdir(self.cache_dir):
+            return
+        for entry in os.scandir(self.cache_dir):
+            if not entry.is_dir():
+                continue
+            for preview in os.scandir(entry.path):
+                md5 = preview.name.split('.', 1)[0]
+                # Leftover temp files of an interrupted run go too
+                if md5 not in keep or preview.name.endswith('.tmp'):
+                    os.remove(preview.path)
+                    self.stats['evicted'] += 1
+
+    def run(self, evict: bool = True) -> Dict:
+        """Generate missing previews, evict stale ones, write the manifest"""
+        start = time.monotonic()
+        manifest = {}
+        tasks = []
+        queued = set()
+
+        for rel_path, filepath in self.iter_images():
+            self.stats['images'] += 1
+            md5 = self.content_hash(rel_path, filepath)
+            if not md5:
+                continue
+            dest = self.preview_path(md5)
+            manifest[rel_path] = os.path.relpath(dest, self.cache_dir).replace(os.sep, '/')
+            if md5 in queued or os.path.exists(dest):
+                self.stats['cached'] += 1
+                continue
+            queued.add(md5)
+            tasks.append((filepath, dest, self.size, self.fmt, self.quality))
+
+        if tasks:
+            print(f"Generating {len(tasks)} previews with {self.workers} workers ...")
+            failed = set()
+            for task, (dest, error) in zip(tasks, self.render(tasks)):
+                if error:
+                    self.stats['failed'] += 1
+                    self.errors.append((self.index.relative(task[0]), error))
+                    failed.add(os.path.relpath(dest, self.cache_dir).replace(os.sep, '/'))
+                else:
+                    self.stats['generated'] += 1
+            manifest = {rel: preview for rel, preview in manifest.items() if preview not in failed}
+
+        if evict:
+            self.evict({os.path.basename(p).split('.', 1)[0] for p in manifest.values()})
+
+        self.checker.save_cache()
+        self.save_manifest(manifest)
+        self.stats['seconds'] = round(time.monotonic() - start, 1)
+        self.print_report()
+        return self.stats
+
+    def render(self, tasks: List[Tuple]) -> List[Tuple[str, Optional[str]]]:
+        """Render previews in a process pool (decoding is CPU bound)"""
+        if self.workers == 1 or len(tasks) == 1:
+            return [render_preview(task) for task in tasks]
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            return list(executor.map(render_preview, tasks, chunksize=16))
+
+    def save_manifest(self, manifest: Dict[str, str]):
+        """library-relative path -> preview path (relative to the cache dir)"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_file = f"{self.manifest_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({'size': self.size, 'format': self.fmt, 'files': manifest},
+                      f, ensure_ascii=False, indent=1)
+        os.replace(tmp_file, self.manifest_file)
+
+    def print_report(self):
+        report = f"""
+        ========================================
+        PREVIEW REPORT ({self.size}px {self.fmt})
+        ========================================
+        Images: {self.stats['images']}
+        Already cached: {self.stats['cached']}
+        Generated: {self.stats['generated']}
+        Failed: {self.stats['failed']}
+        Evicted: {self.stats['evicted']}
+        Hashed (not in index): {self.stats['hashed']}
+        Time: {self.stats['seconds']}s
+        Cache: {self.cache_dir}
+        """
+        for rel_path, error in self.errors[:20]:
+            report += f"\n        FAILED {rel_path}: {error}"
+        report += "\n        ========================================"
+        print(report)
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Shard Merge Module
+Merging of shard outputs (staged files, plan, stats, index delta) into one
+library with duplicate and name-collision resolution across shards
+"""
+
+import json
+import shutil
+from pathlib import Path
+from datetime import datetime
+from collections import defaultdict
+from typing import Dict, List
+
+from library_index import LibraryIndex
+from duplicate_checker import DuplicateChecker
+from sharding import unique_name
+
+
+class ShardMerger:
+    """Merge shard staging directories into the organized library"""
+
+    # Fsync the merge journal after this many moved files
+    SYNC_EVERY = 100
+
+    def __init__(self, library_dir: str, dry_run: bool = False):
+        self.library_dir = Path(library_dir)
+        self.dry_run = dry_run
+        # Every move is journaled, so an interrupted merge can be resumed
+        self.index = LibraryIndex(str(self.library_dir), durable=not dry_run)
+        # Library files from before the index existed are only found on disk
+        self.checker = DuplicateChecker(
+            cache_file=str(self.library_dir / "logs" / "duplicate_cache.json"))
+
+        # md5 -> library-relative path, for cross-shard/library duplicate detection
+        self.by_hash = {entry['md5']: rel_path for rel_path, entry in self.index.items()}
+
+        self.stats = {
+            'shards': 0,
+            'merged': 0,
+            'duplicates': 0,
+            'renamed': 0,
+            'missing': 0,
+            'resumed': 0,
+            'size_saved': 0,
+        }
+        self.shard_stats = []
+        self.collisions = []
+
+    def find_shards(self) -> List[Path]:
+        """All shard staging directories under <library>/shards"""
+        shards_root = self.library_dir / "shards"
+        if not shards_root.is_dir():
+            return []
+        return sorted(p for p in shards_root.iterdir()
+                      if p.is_dir() and not (p / "merged.json").exists())
+
+    def merge_shard(self, shard_dir: Path):
+        """Move one shard's staged files into the library"""
+        shard_index = LibraryIndex(str(shard_dir))
+        self.stats['shards'] += 1
+
+        stats_file = shard_dir / "stats.json"
+        if stats_file.exists():
+            with open(stats_file, 'r', encoding='utf-8') as f:
+                self.shard_stats.append(json.load(f))
+
+        on_disk = self.find_unindexed_duplicates(shard_dir, shard_index)
+
+        for rel_path in shard_index.keys():
+            entry = shard_index.get(rel_path)
+            staged = shard_dir / rel_path
+            if not staged.exists():
+                self.resume_moved(rel_path, entry)
+                continue
+
+            # Same content already in the library (or an earlier shard)
+            if entry['md5'] in self.by_hash or on_disk.get(str(staged)):
+                self.stats['duplicates'] += 1
+                self.stats['size_saved'] += entry['size']
+                if not self.dry_run:
+                    staged.unlink()
+                continue
+
+            # Same Denote name, different content
+            dest = self.library_dir / rel_path
+            if dest.exists() or self.index.relative(str(dest)) in self.index:
+                dest = unique_name(dest, lambda p: p.exists() or self.index.relative(str(p)) in self.index)
+                self.collisions.append((rel_path, self.index.relative(str(dest))))
+                self.stats['renamed'] += 1
+
+            if not self.dry_run:
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                shutil.move(str(staged), str(dest))
+            self.index.add(str(dest), entry['md5'], entry['size'], entry.get('mtime'))
+            self.by_hash[entry['md5']] = self.index.relative(str(dest))
+            self.stats['merged'] += 1
+            if self.stats['merged'] % self.SYNC_EVERY == 0:
+                self.index.sync()
+
+        if not self.dry_run:
+            self.index.sync()
+            with open(shard_dir / "merged.json", 'w', encoding='utf-8') as f:
+                json.dump({'merged_at': datetime.now().isoformat(timespec='seconds'),
+                           'library': str(self.library_dir)}, f, indent=2)
+            self.index.save()
+
+    def find_unindexed_duplicates(self, shard_dir: Path, shard_index: LibraryIndex) -> Dict[str, str]:
+        """
+        Size+hash check of staged files against their destination directories,
+        one walk per directory (like check_duplicate), for library files that
+        are not in the index
+        Returns {staged path: library duplicate}
+        """
+        by_dir = defaultdict(list)
+        for rel_path in shard_index.keys():
+            entry = shard_index.get(rel_path)
+            staged = shard_dir / rel_path
+            dest = self.library_dir / rel_path
+            if entry['md5'] not in self.by_hash and staged.exists() and dest.parent.is_dir():
+                by_dir[dest.parent].append((str(staged), str(dest)))
+
+        duplicates = {}
+        for dest_dir, pairs in by_dir.items():
+            for staged, duplicate in self.checker.check_duplicates(pairs, str(dest_dir)).items():
+                # Only files already in the library (a match may also be the planned
+                # destination of an earlier staged file; by_hash handles those)
+                if duplicate and self.checker.calculate_hash(duplicate) == self.checker.calculate_hash(staged):
+                    duplicates[staged] = duplicate
+        return duplicates
+
+    def resume_moved(self, rel_path: str, entry: Dict):
+        """
+        A staged file that is gone: already merged by an interrupted run
+        (journaled, or moved just before the interruption) or really missing
+        """
+        if entry['md5'] in self.by_hash:
+            self.stats['resumed'] += 1
+            return
+        dest = self.library_dir / rel_path
+        if dest.exists() and self.checker.calculate_hash(str(dest)) == entry['md5']:
+            self.index.add(str(dest), entry['md5'], entry['size'], entry.get('mtime'))
+            self.by_hash[entry['md5']] = self.index.relative(str(dest))
+            self.stats['resumed'] += 1
+            return
+        self.stats['missing'] += 1
+
+    def combined_stats(self) -> Dict:
+        """Sum the per-shard organizer statistics"""
+        combined = {}
+        for shard in self.shard_stats:
+            for key, value in shard.items():
+                if isinstance(value, dict):
+                    bucket = combined.setdefault(key, {})
+                    for sub_key, count in value.items():
+                        bucket[sub_key] = bucket.get(sub_key, 0) + count
+                elif isinstance(value, (int, float)):
+                    combined[key] = combined.get(key, 0) + value
+        return combined
+
+    def run(self, shard_dirs: List[str] = None) -> Dict:
+        """Merge the given shard dirs (default: all unmerged under <library>/shards)"""
+        shards = [Path(d) for d in shard_dirs] if shard_dirs else self.find_shards()
+        for shard_dir in shards:
+            print(f"Merging {shard_dir} ...")
+            self.merge_shard(shard_dir)
+
+        if self.dry_run:
+            # Nothing was moved, so nothing may be recorded
+            self.index.dirty = False
+        self.index.save()
+        self.checker.save_cache()
+        self.write_report()
+        return self.stats
+
+    def write_report(self):
+        """Print and save the merge report"""
+        combined = self.combined_stats()
+        report = f"""
+        ========================================
+        MERGE REPORT{' (DRY RUN)' if self.dry_run else ''}
+        ========================================
+        Shards merged: {self.stats['shards']}
+        Files merged: {self.stats['merged']}
+        Cross-shard/library duplicates: {self.stats['duplicates']}
+        Renamed (name collisions): {self.stats['renamed']}
+        Missing staged files: {self.stats['missing']}
+        Already merged (resumed run): {self.stats['resumed']}
+        Space Saved (duplicates): {self.stats['size_saved'] / (1024 * 1024):.2f} MB
+
+        Shard totals:
+        - Total Files: {combined.get('total_files', 0)}
+        - Processed: {combined.get('processed', 0)}
+        - Duplicates within shards: {combined.get('duplicates', 0)}
+        - Errors: {combined.get('errors', 0)}
+        """
+
+        for original, renamed in self.collisions:
+            report += f"\n        RENAMED {original} -> {renamed}"
+
+        report += "\n        ========================================"
+        print(report)
+
+        log_dir = self.library_dir / "logs"
+        log_dir.mkdir(parents=True, exist_ok=True)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        with open(log_dir / f"merge_{timestamp}.txt", 'w', encoding='utf-8') as f:
+            f.write(report)
+        with open(log_dir / f"merge_{timestamp}.json", 'w', encoding='utf-8') as f:
+            json.dump({'merge': self.stats, 'shards': combined,
+                       'collisions': self.collisions}, f, ensure_ascii=False, indent=2)
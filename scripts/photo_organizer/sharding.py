@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Sharding Module
+Deterministic splitting of the enumerated backup files into shards and
+Denote name collision handling, shared by imports and the shard merge
+(no heavy imports: the organizer loads this at startup)
+"""
+
+import zlib
+from pathlib import Path
+from typing import List, Tuple
+
+
+SHARD_MODES = ('folder', 'hash')
+
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """Parse a 'K/N' shard spec (1-based K)"""
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise ValueError(f"Invalid shard '{value}', expected K/N (e.g. 2/4)")
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Invalid shard '{value}', K must be between 1 and N")
+    return index, count
+
+
+def shard_dir_name(index: int, count: int) -> str:
+    return f"shard-{index}-of-{count}"
+
+
+def select_backup_folders(backup_folders: List[Path], index: int, count: int) -> List[Path]:
+    """'folder' mode: sorted backup folders are dealt round-robin to shards"""
+    return [folder for i, folder in enumerate(sorted(backup_folders)) if i % count == index - 1]
+
+
+def in_hash_shard(rel_path: str, index: int, count: int) -> bool:
+    """'hash' mode: stable CRC32 of the source-relative path picks the shard"""
+    return zlib.crc32(rel_path.encode('utf-8')) % count == index - 1
+
+
+def unique_name(path: Path, taken) -> Path:
+    """
+    Resolve a Denote name collision by suffixing the title part
+    20190803T123204--img__photo.jpg -> 20190803T123204--img-2__photo.jpg
+    taken: callable telling whether a candidate path is already used
+    """
+    stem, ext = path.stem, path.suffix
+    if '__' in stem:
+        base, tags = stem.split('__', 1)
+        tags = f"__{tags}"
+    else:
+        base, tags = stem, ''
+
+    n = 2
+    while True:
+        candidate = path.with_name(f"{base}-{n}{tags}{ext}")
+        if not taken(candidate):
+            return candidate
+        n += 1
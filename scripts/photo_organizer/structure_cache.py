@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Structure Cache Module
+Per-directory summaries (file count, bytes, per-extension counts, child
+directories) for backup structure analysis, cached on disk and reused while
+the directory mtime is unchanged. Adding, removing or renaming entries
+changes a directory's mtime; rewriting a file in place does not, which is
+fine for SmartSwitch backups (they are never modified after the fact)
+"""
+
+import os
+import json
+import threading
+from collections import Counter
+from typing import Dict
+
+
+CACHE_VERSION = 1
+
+
+class StructureCache:
+    """Cached directory scanner"""
+
+    def __init__(self, cache_file: str = None):
+        """
+        Args:
+            cache_file: JSON cache path (None = no persistence)
+        """
+        self.cache_file = cache_file
+        self.dirs = {}
+        self.seen = set()
+        self.lock = threading.Lock()
+        self.stats = {'scanned': 0, 'reused': 0}
+
+        if cache_file and os.path.exists(cache_file):
+            self.load()
+
+    def load(self):
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == CACHE_VERSION:
+                self.dirs = data.get('dirs', {})
+        except Exception as e:
+            print(f"Warning: Could not load structure cache: {e}")
+            self.dirs = {}
+
+    def save(self, prune_under: str = None):
+        """
+        Save the cache atomically
+        prune_under: Drop entries below this directory that were not seen in
+                     this run (deleted directories)
+        """
+        if not self.cache_file:
+            return
+        if prune_under:
+            prefix = os.path.join(os.path.abspath(prune_under), '')
+            self.dirs = {path: entry for path, entry in self.dirs.items()
+                         if path in self.seen or not path.startswith(prefix)}
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            tmp_file = f"{self.cache_file}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({'version': CACHE_VERSION, 'dirs': self.dirs}, f, ensure_ascii=False)
+            os.replace(tmp_file, self.cache_file)
+        except Exception as e:
+            print(f"Warning: Could not save structure cache: {e}")
+
+    def scan_dir(self, path: str) -> Dict:
+        """Own-level summary of one directory (cached by mtime, keyed by absolute path)"""
+        path = os.path.abspath(path)
+        mtime_ns = os.stat(path).st_mtime_ns
+        entry = self.dirs.get(path)
+        if entry and entry['mtime_ns'] == mtime_ns:
+            with self.lock:
+                self.seen.add(path)
+                self.stats['reused'] += 1
+            return entry
+
+        files = 0
+        size = 0
+        extensions = Counter()
+        dirs = []
+        names = []
+        with os.scandir(path) as it:
+            for item in it:
+                try:
+                    if item.is_dir(follow_symlinks=False):
+                        dirs.append(item.name)
+                    elif item.is_file(follow_symlinks=False):
+                        files += 1
+                        size += item.stat(follow_symlinks=False).st_size
+                        extensions[os.path.splitext(item.name)[1].lower()] += 1
+                        if item.name == 'backup_media.db':
+                            names.append(item.name)
+                except OSError:
+                    continue
+
+        entry = {
+            'mtime_ns': mtime_ns,
+            'files': files,
+            'size': size,
+            'extensions': dict(extensions),
+            'dirs': sorted(dirs),
+            'media_db': names,
+        }
+        with self.lock:
+            self.dirs[path] = entry
+            self.seen.add(path)
+            self.stats['scanned'] += 1
+        return entry
+
+    def summarize(self, path: str, depth: int = 2) -> Dict:
+        """
+        Recursive totals for a directory tree
+        Returns files, size, extensions, media_db (paths) and subfolders:
+        relative path -> {files, size} for subfolders up to depth levels down
+        """
+        path = os.path.abspath(path)
+        entry = self.scan_dir(path)
+        summary = {
+            'files': entry['files'],
+            'size': entry['size'],
+            'extensions': Counter(entry['extensions']),
+            'subfolders': {},
+            'media_db': [os.path.join(path, name) for name in entry['media_db']],
+        }
+
+        for name in entry['dirs']:
+            try:
+                child = self.summarize(os.path.join(path, name), max(depth - 1, 0))
+            except OSError:
+                # Removed while scanning
+                continue
+            summary['files'] += child['files']
+            summary['size'] += child['size']
+            summary['extensions'].update(child['extensions'])
+            summary['media_db'].extend(child['media_db'])
+            if depth > 0:
+                summary['subfolders'][name] = {'files': child['files'], 'size': child['size']}
+                for rel_path, totals in child['subfolders'].items():
+                    summary['subfolders'][f"{name}/{rel_path}"] = totals
+
+        return summary
+